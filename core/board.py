@@ -5,10 +5,17 @@ Date: 08/16/2020
 
 Generates and manages tile-based map for game. Also includes coordinate system. Map is dynamically broken into chunks
 to prepare map for HPA* pathfinding. Upon generating, map pre-computes paths between chunks using regular gates. Map can
-update when walls are destroyed.
-
-Also provides a few auxiliary classes used by other modules. Paths are used by enemies in sprite class and CoordMap is
-used to keep track of sprites paths in relation to another.
+update when walls are destroyed. While walls are being built the map searches paths between gates in spare frame time
+and caches them, so generating only has to search paths near the last walls placed.
+
+Also provides a few auxiliary classes used by other modules. Paths are used by enemies in sprite class, HPA* searches
+return SegmentedPaths that refer to the precomputed paths between gates instead of copying them. CountMap is
+used to keep track of sprites paths in relation to another, and PathInvalidator indexes them by node so events can mark
+the enemies whose paths they make stale. ReservationTable records where agents plan to be over the
+next few steps so that cooperative searches can plan around each other. Long paths can be smoothed into WaypointPaths,
+straight lines of cells between waypoints that are only made as an enemy walks them. OccupancyGrid keeps walls in a
+flat byte array so movement can be traced through the grid without hashing coords, along with a mask of legal moves out
+of every cell that searches and the player read instead of testing walls.
 
 Classes:
     Map
@@ -17,22 +24,45 @@ Classes:
     NodeSide
     Cell
     Coord
+    CSRGraph
+    GateTable
+    Landmarks
+    Connectivity
     Path
-    CoordMap
+    ReversedPath
+    SegmentedPath
+    WaypointPath
+    CountMap
+    PathInvalidator
+    OccupancyGrid
+    SearchWorkspace
+    SearchStats
+    SearchLog
+    ReservationTable
 """
 
 from data import settings
 
-from random import randint
-from queue import PriorityQueue
-from itertools import combinations
+import random
+import math
+from array import array
+from heapq import heappush, heappop, heapify
+from collections import deque
+from itertools import combinations, islice, chain
+from time import perf_counter
 
 
 class Map:
     """final map product, uses other classes to build, provides pathfinding functionality and search function"""
 
-    def __init__(self):
+    def __init__(self, rand=None, occupancy=None):
         self.walls = None  # later updated through setter
+        self.random = rand if rand is not None else random  # source of random gate choices and search variation
+
+        # legal moves of every cell, a grid owned by map is filled from walls it is given, a shared grid is kept up to
+        # date by whoever places walls
+        self.occupancy = occupancy if occupancy is not None else OccupancyGrid()
+        self.ownsOccupancy = occupancy is None
 
         self.cells = {}
         self.paths = {}
@@ -40,8 +70,18 @@ class Map:
 
         self.gates = set()
         self.gateCoords = set()
+        self.gateTable = GateTable()
+        self.landmarks = None  # made on generate if settings ask for landmarks
+        self.connectivity = None  # made on generate
         self.nodes = NodeGroup(settings.numNodes, settings.cellsInNode)
 
+        # gate paths searched during build phase, kept until a wall is placed on or removed near them
+        self.pathCache = {}  # combo: path
+        self.cachedThrough = {}  # cell index: combos whose cached path crosses cell
+        self.pending = {}  # combos of current gates with no cached path, in order they were found
+        self.dirtyGates = {}  # cell index: gate whose neighbors or paths changed since its HPA* row was patched
+        self.generated = False  # abstraction is final, walls only get destroyed from now on
+
         # denoting edges of map
         for pt in range(settings.numCells[0]):
             self.edges.append(Coord(pt, 0))
@@ -52,10 +92,12 @@ class Map:
                 self.edges.append(Coord(0, pt))
                 self.edges.append(Coord(settings.numCells[0] - 1, pt))
 
-        # referencing cells in nodes to general dict for easy access
+        # referencing cells in nodes to general dict for easy access, and to list by flat index for searching
+        self.cellList = [None] * (settings.numCells[0] * settings.numCells[1])
         for node in self.nodes:
             for cell in node.cells.values():
                 self.cells[cell.location] = Reference(cell)
+                self.cellList[cell.index] = cell
 
         # adding next-door neighbors to cells
         for node in self.nodes:
@@ -65,14 +107,262 @@ class Map:
                         cell.neighbors["A*"].add(self.cells[cell.location + side].new())
                         cell.numNeighbors += 1
 
-    def generate(self, walls):
-        """makes 'gates' throughout map dependent upon walls; precomputes paths between gates for HPA* searches"""
+        # neighbor graphs packed into arrays for searching, HPA* graph is made once gates have paths
+        self.graphs = {
+            "A*": CSRGraph(len(self.cellList), {cell.index: [(index, 1) for index in sorted(
+                neighbor.get().index for neighbor in cell.neighbors["A*"])] for cell in self.cellList}),
+            "HPA*": None
+        }
+
+        # bit of occupancy mask each A* edge needs, so expanding a cell checks a move without making coords
+        graph = self.graphs["A*"]
+        self.edgeMoves = array("B", bytes(len(graph.targets)))
+        for cell in self.cellList:
+            for edge in range(graph.offsets[cell.index], graph.offsets[cell.index + 1]):
+                neighbor = self.cellList[graph.targets[edge]].location
+                self.edgeMoves[edge] = OccupancyGrid.moveBits[(neighbor.x - cell.location.x + 1) * 3 +
+                                                              neighbor.y - cell.location.y + 1]
+        self.workspace = SearchWorkspace(len(self.cellList))  # reused by every search instead of dicts per search
+
+    def setWalls(self, walls):
+        """walls map is built around, brings grid up to date if map owns it"""
         self.walls = walls
+        if self.ownsOccupancy:
+            self.occupancy.fill(walls)
+
+    def generate(self, walls):
+        """makes 'gates' throughout map dependent upon walls; precomputes paths between gates for HPA* searches, if
+        walls were built with precompute only what it did not get to before walls were done is left"""
+        self.setWalls(walls)
+        if self.connectivity is None:
+            self.makeStructure()
+
+        while len(self.pending) > 0:
+            self.searchGatePath(self.pending.popitem()[0])
+        self.linkDirtyGates()
+        self.gateTable.refresh()
+
+        self.pathCache.clear()
+        self.cachedThrough.clear()
+        self.generated = True
+
+    def makeStructure(self):
+        """
+        starts abstraction over current walls, clearing anything made before
+
+        Connectivity, landmarks if settings ask for them, gates, and combos are made for current walls. HPA* graph and
+        gate table start out empty, every combo is left pending for precompute or generate to search.
+        """
+        for node in self.nodes:
+            node.gates = set()
+            node.combos = set()
+            node.paths = {}
+            for side in node.sides.values():
+                side.gates = []
+                side.numGates = 0
+                side.hasWalls = False
+
+        for cell in self.cellList:
+            cell.neighbors["allHPA*"] = set()
+            cell.neighbors["HPA*"] = set()
+
+        self.gates = set()
+        self.gateCoords = set()
+        self.paths = {}
+
+        self.connectivity = Connectivity(self)
+        self.landmarks = Landmarks(self, settings.numLandmarks) if settings.numLandmarks > 0 else None
+
         self.makeGates(self.walls)
         self.connectNodes()
         self.connectGates()
         self.makeCombos()
-        self.makePaths()
+
+        self.pathCache = {}
+        self.cachedThrough = {}
+        self.pending = dict.fromkeys(combo for node in self.nodes for combo in node.combos)
+        self.dirtyGates = {gate.get().index: gate.get() for gate in self.gates}
+
+        self.graphs["HPA*"] = CSRGraph(len(self.cellList), {})
+        self.gateTable = GateTable()
+
+    def wallChanged(self, coord, built):
+        """
+        called when a wall is built or removed during build phase, keeps abstraction started by precompute up to date
+
+        Connectivity is patched, landmarks are dropped as their distances go stale, gates are placed again on sides of
+        node holding coord, and cached gate paths the change may have broken are dropped. A wall built on a cell drops
+        cached paths crossing that cell or a cell next to it, since a wall can also block diagonal moves past it. A wall
+        removed drops cached paths with a gate in the node of the cell or one next to it, as they may have become
+        shorter or may no longer fail. Gates that changed are only marked dirty, their HPA* rows and stale gate table
+        rows are patched by next precompute.
+        """
+        if self.connectivity is None:  # nothing made yet, precompute starts from walls as they are
+            return
+
+        if built:
+            self.connectivity.closeCell(coord)
+        else:
+            self.connectivity.openCell(coord)
+        self.landmarks = None
+
+        self.placeGatesAround(coord)
+
+        if built:
+            stale = set()
+            for side in ((0, 0),) + Cell.sides:
+                if settings.isInCellMap(coord + side):
+                    stale.update(self.cachedThrough.get((coord + side).index(), ()))
+        else:
+            center = coord.getNode()
+            nodes = {center + (dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+            stale = {combo for combo in self.pathCache if combo[0].getNode() in nodes or combo[1].getNode() in nodes}
+
+        for combo in stale:
+            self.dropGatePath(combo)
+
+    def placeGatesAround(self, coord):
+        """
+        places gates again on sides of node holding coord that coord is on, then brings gates, neighbors, and combos of
+        that node and of nodes sharing those sides up to date; combos that went away lose their paths, new ones are
+        left pending
+        """
+        node = self.nodes(coord.getNode())
+        sides = [side for side in node.sides.values() if side.numCells > 0 and coord in side]
+        if len(sides) == 0:  # gates are only placed on sides
+            return
+
+        affected = [node] + [self.nodes(node.location + side.border) for side in sides
+                             if settings.isInNodeMap(node.location + side.border)]
+        before = [set(other.combos) for other in affected]
+        old = {gate.get().location: gate.get() for other in affected for gate in other.gates}
+
+        for side in sides:
+            side.placeGates(self.walls)
+        for other in affected:
+            other.reconnect()
+            other.combos = set()
+            other.makeCombos()
+
+        new = {gate.get().location: gate.get() for other in affected for gate in other.gates}
+        removed = old.keys() - new.keys()
+        if len(removed) > 0:
+            self.gates = {gate for gate in self.gates if gate.get().location not in removed}
+            self.gateCoords -= removed
+        for location in new.keys() - old.keys():
+            self.gates.add(self.cells[location].new())
+            self.gateCoords.add(location)
+
+        # every gate sharing a node with a gate that changed is in one of affected nodes
+        for location, cell in {**old, **new}.items():
+            neighbors = {}
+            if location in self.gateCoords:
+                for other in self.gateNodes(location):
+                    for gate in other.gates:
+                        if gate.get().location != location:
+                            neighbors[gate.get().location] = gate.new()
+            cell.neighbors["allHPA*"] = set(neighbors.values())
+            self.dirtyGates[cell.index] = cell
+
+        for other, combos in zip(affected, before):
+            for combo in combos - other.combos:
+                other.paths.pop(combo, None)
+                other.paths.pop((combo[1], combo[0]), None)
+                if len(self.comboNodes(combo)) == 0:
+                    self.pending.pop(combo, None)
+                    if combo in self.pathCache:
+                        self.dropGatePath(combo)
+
+            for combo in other.combos - combos:
+                if combo in self.pathCache:
+                    self.setGatePath(combo, self.pathCache[combo])
+                else:
+                    self.pending[combo] = None
+
+    def gateNodes(self, location):
+        """nodes holding gate at location, gates on right or down side of a node are shared with node across it"""
+        owner = location.getNode()
+        return [self.nodes(owner + offset) for offset in ((0, 0), (1, 0), (0, 1))
+                if settings.isInNodeMap(owner + offset) and
+                any(gate.get().location == location for gate in self.nodes(owner + offset).gates)]
+
+    def comboNodes(self, combo):
+        """nodes that have combo among their combos"""
+        owner = combo[0].getNode()
+        return [self.nodes(owner + offset) for offset in ((0, 0), (1, 0), (0, 1))
+                if settings.isInNodeMap(owner + offset) and combo in self.nodes(owner + offset).combos]
+
+    def searchGatePath(self, combo):
+        """searches path between gates of combo"""
+        self.setGatePath(combo, self.search(combo[0], combo[1], "A*", abort=50))
+
+    def setGatePath(self, combo, path):
+        """caches path between gates of combo and makes it and its reverse the paths HPA* uses between them"""
+        self.pathCache[combo] = path
+        for pt in path:
+            self.cachedThrough.setdefault(pt.index(), set()).add(combo)
+
+        reverseCombo = (combo[1], combo[0])
+        reversePath = ReversedPath(path)
+        for node in self.comboNodes(combo):
+            node.paths[combo] = path
+            if not path.failed:
+                node.paths[reverseCombo] = reversePath
+
+        if not path.failed:
+            self.paths[combo] = Reference(path)
+            self.paths[reverseCombo] = Reference(reversePath)
+
+        for location in combo:
+            self.dirtyGates[location.index()] = self.cells[location].get()
+
+    def dropGatePath(self, combo):
+        """forgets cached path of combo and paths HPA* made from it, combo is pending again if it is still a combo"""
+        path = self.pathCache.pop(combo)
+        for pt in path:
+            self.cachedThrough[pt.index()].discard(combo)
+
+        reverseCombo = (combo[1], combo[0])
+        self.paths.pop(combo, None)
+        self.paths.pop(reverseCombo, None)
+
+        nodes = self.comboNodes(combo)
+        for node in nodes:
+            node.paths.pop(combo, None)
+            node.paths.pop(reverseCombo, None)
+        if len(nodes) > 0:
+            self.pending[combo] = None
+
+        for location in combo:
+            self.dirtyGates[location.index()] = self.cells[location].get()
+
+    def linkDirtyGates(self):
+        """links gates whose neighbors or paths changed and patches their rows of HPA* graph"""
+        dirty, self.dirtyGates = self.dirtyGates, {}
+        cells = [dirty[index] for index in sorted(dirty)]
+        for cell in cells:
+            self.linkGate(cell)
+        self.updateAbstractGraph(cells)
+
+    def precompute(self, walls, searches, budget):
+        """
+        searches up to searches paths between gates for current walls, then recomputes stale gate table rows until
+        budget seconds are spent, so generating only has to finish what the last walls placed changed
+
+        Searches are counted rather than timed since which paths get cached decides paths enemies take later, a game
+        has to play out the same on any machine. Gate table rows come out the same however their repair is spread over
+        ticks, so they can go by time. First call starts abstraction over walls built so far, wallChanged keeps it up
+        to date after that.
+        """
+        deadline = perf_counter() + budget
+        self.setWalls(walls)
+        if self.connectivity is None:
+            self.makeStructure()
+
+        for _ in range(min(searches, len(self.pending))):
+            self.searchGatePath(self.pending.popitem()[0])
+        self.linkDirtyGates()
+        self.gateTable.refresh(deadline)
 
     def makeGates(self, walls):
         """has each node in NodeGroup place gates on edges"""
@@ -111,32 +401,13 @@ class Map:
         for node in self.nodes:
             node.makeCombos()
 
-    def makePaths(self):
-        """pre-computes paths for all gate combinations, checks if valid"""
-        for node in self.nodes:
-            for combo in node.combos:
-                if combo not in self.paths:
-                    path = self.search(combo[0], combo[1], "A*", abort=50)
-                    node.paths[combo] = path
-
-                    if not path.failed:
-                        reverseCombo = (combo[1], combo[0])
-                        reversePath = Path(path[::-1])
-                        node.paths[reverseCombo] = reversePath
-
-                        self.paths[combo] = Reference(path)
-                        self.paths[reverseCombo] = Reference(reversePath)
-
-            for gate in node.gates:
-                for neighborGate in gate.get().neighbors["allHPA*"]:
-                    if (gate.get().location, neighborGate.get().location) in self.paths:
-                        gateLocations = [cell.get().location for cell in gate.get().neighbors["HPA*"]]
-                        if neighborGate.get().location not in gateLocations:
-                            gate.get().neighbors["HPA*"].add(neighborGate.new())
-
     def update(self, wallLocation):
         """updates gates and paths when walls get destroyed"""
 
+        self.clearSight(wallLocation)
+        self.connectivity.openCell(wallLocation)
+        self.landmarks = None  # landmark distances no longer hold, ALT is only measured on fixed walls
+
         nodeLocation = wallLocation.getNode()
 
         node = self.nodes(nodeLocation)
@@ -144,6 +415,7 @@ class Map:
 
         onSide = False
         counter = 0
+        touched = []  # neighboring nodes that got wall as a gate
 
         for side in node.sides.values():  # for each side
             if wallLocation in side:  # this means wall was on the edge of a node and a new gate should be placed
@@ -153,11 +425,12 @@ class Map:
                 side.addGate(wallRef.new())
                 if settings.isInNodeMap(nodeLocation + side.border):
                     neighborNode = self.nodes(nodeLocation + side.border)
+                    touched.append(neighborNode)
 
                     neighborNode.gates.add(wallRef.new())
                     neighborNode.sides[side.opposite].addGate(wallRef.new())
 
-                    for gate in neighborNode.gates:
+                    for gate in self.ordered(neighborNode.gates):
 
                         if gate.get().location != wallLocation:
                             gate.get().neighbors["allHPA*"].add(wallRef.new())
@@ -171,7 +444,7 @@ class Map:
                             neighborNode.paths[combo] = path
 
                             if not path.failed:
-                                reversePath = Path(path[::-1])
+                                reversePath = ReversedPath(path)
                                 neighborNode.paths[reverse] = reversePath
                                 self.paths[combo] = Reference(path)
                                 self.paths[reverse] = Reference(reversePath)
@@ -185,12 +458,7 @@ class Map:
                             counter = 0
                             break
 
-                    for gate in neighborNode.gates:
-                        for neighborGate in gate.get().neighbors["allHPA*"]:
-                            neighbors = [cell.get().location for cell in gate.get().neighbors["HPA*"]]
-                            if neighborGate.get().location not in neighbors and \
-                                    (gate.get().location, neighborGate.get().location) in self.paths:
-                                gate.get().neighbors["HPA*"].add(neighborGate.new())
+                    self.linkGates(neighborNode)
 
         if onSide:  # make paths in node that side is a part of
             node.gates.add(wallRef.new())
@@ -198,7 +466,7 @@ class Map:
             self.gates.add(wallRef.new())
             self.gateCoords.add(wallLocation)
 
-            for gate in node.gates:
+            for gate in self.ordered(node.gates):
                 if gate.get().location != wallLocation:
                     gate.get().neighbors["allHPA*"].add(wallRef.new())
                     wallRef.get().neighbors["allHPA*"].add(gate.new())
@@ -210,7 +478,7 @@ class Map:
 
                     node.paths[combo] = path
                     if not path.failed:
-                        reversePath = Path(path[::-1])
+                        reversePath = ReversedPath(path)
                         node.paths[reverse] = reversePath
                         self.paths[combo] = Reference(path)
                         self.paths[reverse] = Reference(reversePath)
@@ -223,12 +491,7 @@ class Map:
                 if counter > 6:  # limits searches for performance
                     break
 
-            for gate in node.gates:
-                for neighborGate in gate.get().neighbors["allHPA*"]:
-                    neighbors = [cell.get().location for cell in gate.get().neighbors["HPA*"]]
-                    if neighborGate.get().location not in neighbors and \
-                            (gate.get().location, neighborGate.get().location) in self.paths:
-                        gate.get().neighbors["HPA*"].add(neighborGate.new())
+            self.linkGates(node)
 
         else:  # wall was not on a side of node; it is in the center and a new gate does not need to be made
             # for all combinations in node that resulted in a failed path, retry pathfinding
@@ -239,34 +502,204 @@ class Map:
                     node.paths[combo] = path
                     if not path.failed:
                         reverseCombo = (combo[1], combo[0])
-                        reversePath = Path(path[::-1])
+                        reversePath = ReversedPath(path)
                         node.paths[reverseCombo] = reversePath
 
                         self.paths[combo] = Reference(path)
                         self.paths[reverseCombo] = Reference(reversePath)
 
-            for gate in node.gates:
-                for neighborGate in gate.get().neighbors["allHPA*"]:
-                    neighbors = [cell.get().location for cell in gate.get().neighbors["HPA*"]]
-                    if neighborGate.get().location not in neighbors and \
-                            (gate.get().location, neighborGate.get().location) in self.paths:
-                        gate.get().neighbors["HPA*"].add(neighborGate.new())
+            self.linkGates(node)
+
+        self.updateAbstractGraph(gate.get() for gate in chain(node.gates, *(neighbor.gates for neighbor in touched)))
+
+    def linkGates(self, node):
+        """makes gates in node HPA* neighbors of the gates they have a precomputed path to"""
+        for gate in node.gates:
+            self.linkGate(gate.get())
+
+    def linkGate(self, cell):
+        """makes HPA* neighbors of gate cell the gates sharing a node with it that it has a precomputed path to"""
+        linked = {}
+        for neighborGate in cell.neighbors["allHPA*"]:
+            location = neighborGate.get().location
+            if location not in linked and (cell.location, location) in self.paths:
+                linked[location] = neighborGate.new()
+        cell.neighbors["HPA*"] = set(linked.values())
+
+    def gateEdges(self, cell):
+        """HPA* edges leaving gate cell as (neighbor index, length of precomputed path) in order of neighbor index"""
+        edges = {}
+        for neighbor in cell.neighbors["HPA*"]:
+            edges[neighbor.get().index] = len(self.paths[(cell.location, neighbor.get().location)].get())
+        return sorted(edges.items())
+
+    def makeAbstractGraph(self):
+        """packs HPA* neighbors of every gate into CSR arrays, edge weights are lengths of precomputed paths"""
+        edges = {gate.get().index: self.gateEdges(gate.get()) for gate in self.ordered(self.gates)}
+        self.graphs["HPA*"] = CSRGraph(len(self.cellList), edges)
+        self.gateTable = GateTable()
+        self.gateTable.update({(index, neighbor): weight for index, row in edges.items() for neighbor, weight in row},
+                              edges.keys())
+        self.gateTable.refresh()
+
+    def updateAbstractGraph(self, cells):
+        """replaces rows of HPA* graph for gate cells whose neighbors may have changed, only edges that actually changed
+        are passed on to gate table; cells no longer gates lose their rows"""
+        graph = self.graphs["HPA*"]
+        cells = {cell.index: cell for cell in sorted(cells, key=lambda cell: cell.index)}
+        changed = {}
+
+        for cell in cells.values():
+            edges = self.gateEdges(cell)
+            before = dict(graph.neighbors(cell.index))
+            if edges == sorted(before.items()):
+                continue
+
+            graph.setRow(cell.index, edges)
+            for neighbor, weight in edges:
+                if before.pop(neighbor, None) != weight:
+                    changed[(cell.index, neighbor)] = weight
+            for neighbor in before:
+                changed[(cell.index, neighbor)] = None
+
+        self.gateTable.update(changed, [index for index, cell in cells.items() if cell.location in self.gateCoords])
+        for index, cell in cells.items():
+            if cell.location not in self.gateCoords and self.gateTable.covers(cell.location):
+                self.gateTable.removeGate(index)
+
+    def dump(self):
+        """
+        gates, combos, and precomputed paths as primitive tuples so a generated map can be restored without searching
+
+        Landmark distances are saved as bytes. Walls and the other structures derived from them (connectivity, HPA*
+        graph, gate table) are left out, load rebuilds them. Paths are stored once each and referred to by position,
+        negative positions refer to reversed views of path -position - 1. A map dumped while walls are still being
+        built keeps only paths cached so far and combos left to search in order, load places gates over walls again.
+        """
+        paths = []
+        positions = {}  # id of path: position in paths
+
+        def pathPosition(path):
+            if isinstance(path, ReversedPath):
+                return -pathPosition(path.source) - 1
+            if id(path) not in positions:
+                positions[id(path)] = len(paths)
+                paths.append((tuple(pt.toTuple() for pt in path), path.failed))
+            return positions[id(path)]
+
+        def combo(pair):
+            return pair[0].toTuple(), pair[1].toTuple()
+
+        landmarks = None if self.landmarks is None else self.landmarks.dump()
+        if not self.generated:
+            cached = tuple((combo(pair), pathPosition(path)) for pair, path in self.pathCache.items())
+            return cached, tuple(combo(pair) for pair in self.pending), tuple(paths), landmarks, False
+
+        nodes = []
+        for node in self.nodes:
+            sides = tuple((name, tuple(gate.get().location.toTuple() for gate in side.gates), side.hasWalls)
+                          for name, side in node.sides.items())
+            nodes.append((node.location.toTuple(),
+                          tuple(gate.get().location.toTuple() for gate in node.gates),
+                          sides,
+                          tuple(combo(pair) for pair in node.combos),
+                          tuple((combo(pair), pathPosition(path)) for pair, path in node.paths.items())))
+
+        neighbors = tuple((cell.index, tuple({ref.get().index for ref in cell.neighbors["allHPA*"]}),
+                           tuple({ref.get().index for ref in cell.neighbors["HPA*"]}))
+                          for cell in self.cellList if len(cell.neighbors["allHPA*"]) > 0)
+
+        return (tuple(nodes), neighbors,
+                tuple((combo(pair), pathPosition(ref.get())) for pair, ref in self.paths.items()),
+                tuple({gate.get().location.toTuple() for gate in self.gates}),
+                tuple(paths),
+                landmarks,
+                True)
+
+    def load(self, walls, data):
+        """restores abstraction made by dump onto a map that has not been generated, then rebuilds what is derived from
+        walls"""
+        generated = data[-1]
+        if generated:
+            nodes, neighbors, mapPaths, gates, pathData, landmarks = data[:-1]
+        else:
+            cached, pending, pathData, landmarks = data[:-1]
+
+        paths = []
+        for points, failed in pathData:
+            path = Path([Coord(pt) for pt in points]) if len(points) > 0 else Path()
+            if failed:
+                path.fail()
+            paths.append(path)
+
+        reversedPaths = {}
+
+        def pathAt(position):
+            if position >= 0:
+                return paths[position]
+            if position not in reversedPaths:
+                reversedPaths[position] = ReversedPath(paths[-position - 1])
+            return reversedPaths[position]
+
+        def combo(pair):
+            return Coord(pair[0]), Coord(pair[1])
+
+        if not generated:  # walls are still being built, precompute goes on from paths it had cached
+            self.setWalls(walls)
+            self.makeStructure()
+            if landmarks is not None:
+                self.landmarks = Landmarks(self, len(landmarks), landmarks)
+            for pair, position in cached:
+                self.setGatePath(combo(pair), pathAt(position))
+            self.pending = dict.fromkeys(combo(pair) for pair in pending)
+            return
+
+        self.setWalls(walls)
+        self.connectivity = Connectivity(self)
+        if landmarks is not None:
+            self.landmarks = Landmarks(self, len(landmarks), landmarks)
+
+        for location, nodeGates, sides, combos, nodePaths in nodes:
+            node = self.nodes(Coord(location))
+            node.gates = {self.cells[Coord(gate)].new() for gate in nodeGates}
+            for name, sideGates, hasWalls in sides:
+                side = node.sides[name]
+                for gate in sideGates:
+                    side.addGate(self.cells[Coord(gate)].new())
+                side.hasWalls = hasWalls
+            node.combos = {combo(pair) for pair in combos}
+            node.paths = {combo(pair): pathAt(position) for pair, position in nodePaths}
+
+        for index, allHPA, HPA in neighbors:
+            cell = self.cellList[index]
+            cell.neighbors["allHPA*"] = {Reference(self.cellList[i]) for i in allHPA}
+            cell.neighbors["HPA*"] = {Reference(self.cellList[i]) for i in HPA}
+
+        self.paths = {combo(pair): Reference(pathAt(position)) for pair, position in mapPaths}
+        for gate in gates:
+            self.gates.add(self.cells[Coord(gate)].new())
+            self.gateCoords.add(Coord(gate))
+
+        self.makeAbstractGraph()
+        self.generated = True
+
+    @staticmethod
+    def ordered(gates):
+        """gates in order of cell index, sets of gates are ordered by object ids so anything picked or limited by order
+        has to go through this to come out the same every run"""
+        return sorted(gates, key=lambda gate: gate.get().index)
 
     def getGates(self, coord):
-        """gets all gates from node that coord is a part of"""
+        """gets all gates from node that coord is a part of in order of cell index"""
         node = coord.getNode()
-        return self.nodes(node).gates
+        return self.ordered(self.nodes(node).gates)
 
     def getRandomGate(self, coord):
         """get a random gate from node that coord is a part of"""
-        node = coord.getNode()
-        if len(self.nodes(node).gates) != 0:
-            c = 0
-            choice = randint(0, len(self.nodes(node).gates) - 1)
-            for gate in self.nodes(node).gates:
-                if c == choice:
-                    return gate.get().location
-                c += 1
+        gates = self.getGates(coord)
+        if len(gates) != 0:
+            choice = self.random.randint(0, len(gates) - 1)
+            return gates[choice].get().location
         else:
             return None
 
@@ -277,7 +710,7 @@ class Map:
 
             temp = {}
 
-            for gate in self.nodes(node).gates:
+            for gate in self.getGates(coord):
                 dx = target.x - gate.get().location.x
                 dy = target.y - gate.get().location.y
                 temp[gate.get().location] = dx ** 2 + dy ** 2
@@ -301,19 +734,16 @@ class Map:
             else:
                 return dy
 
-    def validMove(self, current, nextMove):
-        """checks if going from current to nextMove is valid by checking if walls block movement"""
-        if nextMove in self.walls:
-            return False
-
-        diff = nextMove - current
+    def heuristic(self, cell, target, targetIndex, method):
+        """h_cost tightened by landmark lower bound (ALT) when map has landmarks"""
+        h = self.h_cost(cell, target, method)
+        if self.landmarks is not None:
+            return max(h, self.landmarks.estimate(cell.index, targetIndex))
+        return h
 
-        if diff.x == 0 or diff.y == 0:
-            return True
-        elif (current + Coord(0, diff.y) in self.walls) and current + Coord(diff.x, 0) in self.walls:
-            return False
-        else:
-            return True
+    def validMove(self, current, nextMove):
+        """checks if going from current to nextMove, a cell next to it, is valid by reading legal moves of current"""
+        return self.occupancy.canMove(current, nextMove)
 
     @staticmethod
     def overlaps(pt, paths):
@@ -323,7 +753,7 @@ class Map:
         else:
             return paths[pt]
 
-    def search(self, start, target, searchType, paths=None, abort=None, altTargets=None):
+    def search(self, start, target, searchType, paths=None, abort=None, altTargets=None, epsilon=None):
         """
         allows pathfinding through map around walls
 
@@ -334,15 +764,28 @@ class Map:
             paths -> can pass in the projected paths of all enemies to reduce agent density and improve path diversity
             abort -> returns with failed path if searches this many cells, used to avoid long expensive paths
             altTargets -> if path fails to find target, checks if any in altTargets were found and returns path to them
+            epsilon -> A* only, makes search weighted A* so path found is at most epsilon times as long as shortest path
 
         Search Types:
             A* -> heuristic based pathfinding with dynamic terrain costs
             HPA* -> extension of A* with levels of abstraction; map divided into chunks and HPA* searches bt chunks
+
+        Weighted A* inflates an admissible heuristic (diagonal distance tightened by landmarks) by epsilon, search heads
+        for target more greedily than with epsilon of 1 while path found stays within bound, which is reported as
+        path.stats.bound. Plain A* uses a straighter but inadmissible estimate so its paths have no bound; it expands
+        about as many cells as weighted A* at epsilon 1.5 on open maps, more among scattered walls, and fewer in mazes.
+
+        Every path returned carries a SearchStats record of the search as path.stats.
         """
 
+        stats = SearchStats(searchType)
         counter = 0
+        heuristicCalls = 0
+        frontierPeak = 1
 
-        choice = randint(0, 4)  # allows pseudo random paths; choice used to modify cost calculation and move validity
+        # allows pseudo random paths; choice used to modify cost calculation and move validity, only drawn when it
+        # can change search so searches that can not use it leave random state alone
+        choice = self.random.randint(0, 4) if searchType == "HPA*" or paths is not None else 4
 
         if choice == 4 and searchType == "HPA*":
             costMethod = 1
@@ -354,106 +797,433 @@ class Map:
         else:
             checkOverlap = False
 
-        searched = set()
         path = Path()
 
-        targetFound = False
+        graph = self.graphs[searchType]
+        graph.pack()  # rows patched since last search
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        masks, edgeMoves = self.occupancy.masks, self.edgeMoves
+        cellList = self.cellList
 
-        frontier = PriorityQueue()  # uses priority queue rather than iterative approach to increase performance
-        frontier.put((0, 0, self.cells[start].get()))
+        targetFound = False
+        targetIndex = target.index()
+        startIndex = start.index()
+        expanded = 0
+        searched = 0  # cells reached other than start
 
-        cameFrom = {self.cells[start].get(): self.cells[start].get()}
-        costSoFar = {self.cells[start].get(): 0}
+        # weighted A* needs an admissible estimate to keep its bound, diagonal distance never overestimates
+        weighted = epsilon is not None and searchType == "A*"
+        hMethod, hWeight = (1, epsilon) if weighted else (costMethod, 1)
 
         if target in self.walls or start == target:  # target can not be reached or is already reached
             path.fail()
-            return path
+            return stats.attach(path, "blocked")
+
+        # unless steering around other paths, gate to gate HPA* searches are answered by walking the gate table
+        if searchType == "HPA*" and not checkOverlap and self.gateTable.covers(start):
+            path = self.walkGateTable(start, target, altTargets)
+            return stats.attach(path, "exhausted" if path.failed else "gateTable")
 
-        while not frontier.empty():
-            current = frontier.get()[2]
+        # cell i has been reached this search if reached[i] is generation, expanded if closed[i] is generation
+        workspace = self.workspace
+        generation = workspace.begin()
+        costSoFar, cameFrom, reached, closed = workspace.cost, workspace.parent, workspace.reached, workspace.closed
 
-            if current.location == target:
+        costSoFar[startIndex] = 0
+        cameFrom[startIndex] = startIndex
+        reached[startIndex] = generation
+
+        frontier = [(0, 0, startIndex)]  # heap, counter acts as tiebreaker in case costs are same
+
+        while len(frontier) > 0:
+            index = heappop(frontier)[2]
+            if closed[index] == generation:  # stale entry of cell already expanded at a lower cost
+                continue
+            closed[index] = generation
+
+            current = cellList[index]
+            expanded += 1
+
+            if index == targetIndex:
                 targetFound = True
                 break
 
             failed = 0
 
-            for nextMove in [cellReference.get() for cellReference in current.neighbors[searchType]]:
+            for edge in range(offsets[index], offsets[index + 1]):
+                neighborIndex = targets[edge]
 
                 if searchType == "HPA*" and (not checkOverlap or
-                                             (nextMove.location in {start, target} or
-                                              not self.overlaps(nextMove.location, paths))) or \
-                        searchType == "A*" and self.validMove(current.location, nextMove.location):
-
-                    neighbor = self.cells[nextMove.location].get()
+                                             (cellList[neighborIndex].location in {start, target} or
+                                              not self.overlaps(cellList[neighborIndex].location, paths))) or \
+                        searchType == "A*" and masks[index] & edgeMoves[edge]:
 
-                    if searchType == "A*":
-                        cost = costSoFar[current] + 1
+                    cost = costSoFar[index] + weights[edge]
 
-                    else:
-                        cost = costSoFar[current] + len(self.paths[(current.location, neighbor.location)].get())
-
-                    if neighbor not in costSoFar or cost < costSoFar[neighbor]:
+                    if reached[neighborIndex] != generation or cost < costSoFar[neighborIndex]:
                         counter += 1
 
-                        costSoFar[neighbor] = cost
-
-                        priority = cost + self.h_cost(neighbor, target, costMethod)
+                        if reached[neighborIndex] != generation:
+                            reached[neighborIndex] = generation
+                            searched += 1
+                        closed[neighborIndex] = 0  # cheaper way found, cell can be expanded again
+                        costSoFar[neighborIndex] = cost
 
-                        frontier.put((priority, counter, neighbor))  # counter acts as tiebreaker in case costs are same
+                        neighbor = cellList[neighborIndex]
+                        heuristicCalls += 1
+                        if searchType == "A*":
+                            priority = cost + hWeight * self.heuristic(neighbor, target, targetIndex, hMethod)
+                        else:
+                            priority = cost + self.h_cost(neighbor, target, costMethod)
 
-                        cameFrom[neighbor] = current
+                        heappush(frontier, (priority, counter, neighborIndex))
+                        if len(frontier) > frontierPeak:
+                            frontierPeak = len(frontier)
 
-                        searched.add(neighbor.location)
+                        cameFrom[neighborIndex] = index
 
                 else:
                     failed += 1
 
             if failed == current.numNeighbors:  # returning bc no neighbors
                 path.fail()
-                return path
+                return stats.attach(path, "noMoves", expanded, heuristicCalls, frontierPeak)
 
-            if abort is not None and len(searched) >= abort:  # return bc has searched too many cells w/o finding path
+            if abort is not None and searched >= abort:  # return bc has searched too many cells w/o finding path
                 path.fail()
-                return path
+                return stats.attach(path, "aborted", expanded, heuristicCalls, frontierPeak)
 
-        if frontier.empty() and not targetFound:  # nothing valid left to search and target not reached
+        if not targetFound:  # nothing valid left to search and target not reached
             altTargetFound = False
 
             if altTargets is not None:
                 for pt in [cellReference.get().location for cellReference in altTargets]:
-                    if pt in searched:
+                    if pt != start and reached[pt.index()] == generation:
                         target = pt
+                        targetIndex = pt.index()
                         altTargetFound = True
                         break
 
             if not altTargetFound:
                 path.fail()
 
-                if not checkOverlap and len(searched) > 0:
+                if not checkOverlap and searched > 0:
                     path.trapped = True
 
-                return path
+                return stats.attach(path, "exhausted", expanded, heuristicCalls, frontierPeak)
 
-        toAdd = self.cells[target].obj
+        index = targetIndex
 
-        while toAdd != cameFrom[toAdd]:
-            path.add(toAdd.location)
-            toAdd = cameFrom[toAdd]
+        while index != cameFrom[index]:
+            path.add(cellList[index].location)
+            index = cameFrom[index]
 
-        path.add(self.cells[start].obj.location)
+        path.add(cellList[startIndex].location)
         path.reverse()
 
+        outcome = "found" if targetFound else "altTarget"
+
         if searchType == "A*":
-            return path
+            if weighted:
+                stats.bound = epsilon
+            return stats.attach(path, outcome, expanded, heuristicCalls, frontierPeak)
 
         else:  # search type is HPA*; path found between chunks but still need to fill gaps with precomputed paths
-            temp = Path()
-            for i in range(len(path) - 1):
-                for j in range(len(self.paths[(path[i], path[i + 1])].get()) - 1):
-                    temp.add(self.paths[(path[i], path[i + 1])].get()[j])
-            temp.add(path.end)
-            return temp
+            return stats.attach(self.refine(path), outcome, expanded, heuristicCalls, frontierPeak)
+
+    @staticmethod
+    def lineCells(a, b):
+        """cells on straight line from a to b not including a (Bresenham), each cell is next to the one before it"""
+        dx = abs(b.x - a.x)
+        dy = abs(b.y - a.y)
+        sx = 1 if b.x > a.x else -1
+        sy = 1 if b.y > a.y else -1
+
+        err = dx - dy
+        x, y = a.x, a.y
+
+        cells = []
+        while x != b.x or y != b.y:
+            e2 = 2 * err
+            if e2 > -dy:
+                err -= dy
+                x += sx
+            if e2 < dx:
+                err += dx
+                y += sy
+            cells.append(Coord(x, y))
+        return cells
+
+    def lineOfSight(self, a, b):
+        """True if every move along line of cells from a to b is valid, results are cached in node of a"""
+        cache = self.nodes(a.getNode()).sightCache
+        key = (a.index(), b.index())
+
+        if key not in cache:
+            clear = True
+            current = a
+            for cell in self.lineCells(a, b):
+                if not self.validMove(current, cell):
+                    clear = False
+                    break
+                current = cell
+            cache[key] = clear
+
+        return cache[key]
+
+    def clearSight(self, coord):
+        """forgets cached line of sight results of lines that could pass coord, called when a wall changes"""
+        reach = settings.maxSightLength // min(settings.cellsInNode) + 1
+        center = coord.getNode()
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                if settings.isInNodeMap(center + (dx, dy)):
+                    self.nodes(center + (dx, dy)).sightCache.clear()
+
+    def smooth(self, path):
+        """
+        collapses path into waypoints joined by straight lines of cells (string pulling), each waypoint is the last
+        point of path in line of sight of the one before it and no more than settings.maxSightLength cells away
+
+        Parameters:
+            path -> successful path from search, failed or very short paths are returned as is
+        """
+        if path.failed or len(path) < 3:
+            return path
+
+        points = list(path)
+        waypoints = [points[0]]
+        anchor = points[0]
+
+        for i in range(1, len(points) - 1):
+            nextPoint = points[i + 1]
+            if max(abs(nextPoint.x - anchor.x), abs(nextPoint.y - anchor.y)) > settings.maxSightLength or \
+                    not self.lineOfSight(anchor, nextPoint):
+                anchor = points[i]
+                waypoints.append(anchor)
+
+        waypoints.append(points[-1])
+
+        smoothed = WaypointPath(waypoints)
+        smoothed.trapped = path.trapped
+        smoothed.stats = path.stats
+        return smoothed
+
+    def refine(self, path):
+        """fills in path between gates with the precomputed paths between them"""
+        temp = SegmentedPath()
+        for i in range(len(path) - 1):
+            gatePath = self.paths[(path[i], path[i + 1])].get()
+            if i < len(path) - 2:
+                temp.addSegment(gatePath, len(gatePath) - 1)  # next gate path starts where this one ends
+            else:
+                temp.addSegment(gatePath)
+
+        if len(path) == 1:
+            temp.addSegment(path)
+
+        return temp
+
+    def walkGateTable(self, start, target, altTargets=None):
+        """HPA* search between gates using precomputed next hops, falls back to closest reachable alt target"""
+        route = self.gateTable.route(start.index(), target.index())
+
+        if route is None and altTargets is not None:
+            closest = None
+            for cellReference in altTargets:
+                cell = cellReference.get()
+                if cell.location != start and self.gateTable.covers(cell.location) and \
+                        (closest is None or self.gateTable.distance(start.index(), cell.index) <
+                         self.gateTable.distance(start.index(), closest.index)):
+                    closest = cell
+
+            if closest is not None:
+                route = self.gateTable.route(start.index(), closest.index)
+
+        if route is None:
+            path = Path()
+            path.fail()
+            path.trapped = self.gateTable.reachesAny(start.index())
+            return path
+
+        return self.refine(Path([self.cellList[i].location for i in route]))
+
+    def searchMany(self, target, starts, abort=None):
+        """
+        one backwards search from target that answers many starts at once, lets many enemies share a single search
+
+        Parameters:
+            target -> where every path ends, usually the player
+            starts -> locations to find paths from, one path is returned per start in the same order
+            abort -> stops once this many cells have been searched, starts not reached by then get failed paths
+
+        Every move costs the same so search spreads out from target breadth first until all starts are reached, each
+        path is then read off by following cameFrom from its start back to target. Every path shares one SearchStats,
+        its expanded counts cells taken off the breadth first frontier and it makes no heuristic calls.
+        """
+        stats = SearchStats("batch")
+        expanded = 0
+        frontierPeak = 1
+        aborted = False
+
+        remaining = set(starts)
+        targetCell = self.cells[target].get()
+
+        # cell i has been reached if reached[i] is generation, parent[i] is next cell towards target
+        workspace = self.workspace
+        generation = workspace.begin()
+        cameFrom, reached = workspace.parent, workspace.reached
+
+        cameFrom[targetCell.index] = -1
+        reached[targetCell.index] = generation
+        searched = 1
+        frontier = deque([targetCell])
+
+        offsets, targets = self.graphs["A*"].offsets, self.graphs["A*"].targets
+
+        if target in self.walls:
+            frontier.clear()
+
+        while len(frontier) > 0 and len(remaining) > 0:
+            current = frontier.popleft()
+            expanded += 1
+
+            for edge in range(offsets[current.index], offsets[current.index + 1]):
+                neighbor = self.cellList[targets[edge]]
+
+                # search runs backwards, so move is from neighbor onto current
+                if reached[neighbor.index] != generation and self.validMove(neighbor.location, current.location):
+                    reached[neighbor.index] = generation
+                    cameFrom[neighbor.index] = current.index
+                    searched += 1
+                    remaining.discard(neighbor.location)
+                    frontier.append(neighbor)
+
+            frontierPeak = max(frontierPeak, len(frontier))
+
+            if abort is not None and searched >= abort:  # searched too many cells, give up on the rest
+                aborted = True
+                break
+
+        exhausted = len(frontier) == 0
+        if aborted:
+            outcome = "aborted"
+        else:
+            outcome = "exhausted" if len(remaining) > 0 else "found"
+
+        paths = []
+        for start in starts:
+            path = Path()
+
+            if start == target or start in remaining:
+                path.fail()
+                if exhausted and start != target and searched > 1:
+                    path.trapped = True
+
+            else:
+                index = start.index()
+                while index != -1:
+                    path.add(self.cellList[index].location)
+                    index = cameFrom[index]
+
+            paths.append(stats.attach(path, outcome, expanded, frontierPeak=frontierPeak))
+
+        return paths
+
+    def cooperativeSearch(self, start, target, reservations, agent, abort=None):
+        """
+        windowed hierarchical cooperative A* (WHCA*), plans through space and time for the first steps of the path
+
+        Parameters:
+            start -> where to start search
+            target -> target to pathfind to
+            reservations -> ReservationTable holding where other agents plan to be
+            agent -> agent searching, its own reservations are ignored
+            abort -> passed to the A* search planning the rest of the path beyond the reservation window
+
+        Each step agent can move to a neighbor or wait in place. Cells and swaps reserved by other agents are avoided
+        for as many steps as the reservation table window, after that the remainder is planned with regular A*.
+        """
+        stats = SearchStats("WHCA*")
+        path = Path()
+
+        if target in self.walls or start == target:  # target can not be reached or is already reached
+            path.fail()
+            return stats.attach(path, "blocked")
+
+        now = reservations.now()
+        startCell = self.cells[start].get()
+
+        counter = 0
+        frontier = [(0, 0, startCell, 0)]  # (priority, tiebreaker, cell, step)
+
+        cameFrom = {(startCell, 0): None}
+        costSoFar = {(startCell, 0): 0}
+
+        end = None
+        expanded = 0
+        heuristicCalls = 0
+        frontierPeak = 1
+
+        while len(frontier) > 0:
+            _, _, current, step = heappop(frontier)
+            expanded += 1
+
+            if current.location == target or step == reservations.window:
+                end = (current, step)
+                break
+
+            moves = [self.cellList[i] for i, _ in self.graphs["A*"].neighbors(current.index)]
+            moves.append(current)  # waiting in place is also a move
+
+            for nextMove in moves:
+                if nextMove is not current and not self.validMove(current.location, nextMove.location):
+                    continue
+
+                if not reservations.canMove(current.location, nextMove.location, now + step, agent):
+                    continue
+
+                state = (nextMove, step + 1)
+                cost = costSoFar[(current, step)] + 1
+
+                if state not in costSoFar or cost < costSoFar[state]:
+                    counter += 1
+                    costSoFar[state] = cost
+                    cameFrom[state] = (current, step)
+                    heuristicCalls += 1
+                    heappush(frontier, (cost + self.h_cost(nextMove, target, 0), counter, nextMove, step + 1))
+                    frontierPeak = max(frontierPeak, len(frontier))
+
+        stats.attach(path, "found", expanded, heuristicCalls, frontierPeak)
+
+        if end is None:  # every move is blocked by other agents, plan without them
+            rest = self.search(start, target, "A*", abort=abort)
+            stats.absorb(rest.stats)
+            rest.stats = stats
+            return rest
+
+        state = end
+        while state is not None:
+            path.add(state[0].location)
+            state = cameFrom[state]
+        path.reverse()
+
+        if end[0].location != target:
+            rest = self.search(end[0].location, target, "A*", abort=abort)
+            stats.absorb(rest.stats)
+
+            if rest.failed:  # points planned so far lead nowhere, fail with empty path like search does
+                failed = Path()
+                failed.fail()
+                failed.trapped = rest.trapped
+                failed.stats = stats
+                return failed
+
+            for pt in rest[1:]:
+                path.add(pt)
+
+        path.waits = True
+        return path
 
 
 class NodeGroup:
@@ -519,6 +1289,8 @@ class Node:
         self.combos = set()
         self.paths = {}
 
+        self.sightCache = {}  # (cell index, cell index): line of sight between them, for lines starting in node
+
         self.numNeighbors = 0
 
         self.neighbors = {
@@ -599,25 +1371,7 @@ class Node:
         """places gates on sides within node based on walls in node"""
         for side in self.sides.values():  # for each side
             if side.numCells != 0:
-                i = 0
-                for cellRef in side.cells:
-                    if cellRef.get().location in walls:
-                        side.hasWalls = True
-
-                        # following adds a gate to either side of wall if position is valid
-                        if (i - 1) >= 0:
-                            if side.cells[i - 1].get().location not in walls \
-                                    and side.cells[i - 1] not in side.gates:
-                                side.addGate(side.cells[i - 1].new())
-                        if (i + 1) < side.numCells:
-                            if side.cells[i + 1].get().location not in walls \
-                                    and side.cells[i + 1].get() not in side.gates:
-                                side.addGate(side.cells[i + 1].new())
-                    i += 1
-
-                # if side has no walls, put a gate in the middle of side
-                if side.numGates == 0 and not side.hasWalls:
-                    side.addGate(side.cells[int(side.numCells / 2)].new())
+                side.placeGates(walls)
 
     def connectNode(self):
         """connect node with neighboring nodes by adding their bottom and right gates to this node's gates"""
@@ -641,9 +1395,21 @@ class Node:
                     self.gates.add(gate)
                     self.sides["left"].addGate(gate)
 
+    def reconnect(self):
+        """collects gates again after gates were placed again on a side of this node or of a neighbor it takes gates
+        from"""
+        for side in self.sides.values():
+            if side.numCells == 0:  # only holds gates taken from neighbor
+                side.gates = []
+                side.numGates = 0
+
+        self.gates = set()
+        self.connectNode()
+
     def makeCombos(self):
-        """generate all possible combinations of gates from this node"""
-        temp = [gate.obj.location for gate in self.gates]
+        """generate all possible combinations of gates from this node, gates in a combo are in order of cell index so
+        nodes sharing two gates make the same combo"""
+        temp = sorted((gate.obj.location for gate in self.gates), key=Coord.index)
         for combo in combinations(temp, 2):
             self.combos.add(combo)
 
@@ -703,6 +1469,33 @@ class NodeSide:
         self.cells.append(cell)
         self.numCells += 1
 
+    def placeGates(self, walls):
+        """places a gate on either side of every wall on side, or one in middle of side if it has no walls, replacing
+        gates placed before"""
+        self.gates = []
+        self.numGates = 0
+        self.hasWalls = False
+
+        i = 0
+        for cellRef in self.cells:
+            if cellRef.get().location in walls:
+                self.hasWalls = True
+
+                # following adds a gate to either side of wall if position is valid
+                if (i - 1) >= 0:
+                    if self.cells[i - 1].get().location not in walls \
+                            and self.cells[i - 1] not in self.gates:
+                        self.addGate(self.cells[i - 1].new())
+                if (i + 1) < self.numCells:
+                    if self.cells[i + 1].get().location not in walls \
+                            and self.cells[i + 1].get() not in self.gates:
+                        self.addGate(self.cells[i + 1].new())
+            i += 1
+
+        # if side has no walls, put a gate in the middle of side
+        if self.numGates == 0 and not self.hasWalls:
+            self.addGate(self.cells[int(self.numCells / 2)].new())
+
     def addGate(self, cell):
         """adds gate to side, usually as reference"""
         self.gates.append(cell)
@@ -728,19 +1521,18 @@ class NodeSide:
 
 class Cell:
     """rectangle representing coord, has neighbors"""
-    sides = None
+    sides = ((1, 0), (-1, 0), (0, -1), (0, 1), (-1, 1), (1, 1), (1, -1), (-1, -1))  # offsets to next-door cells
 
     def __init__(self, row, col):
         self.location = Coord(row, col)
         self.x = row
         self.y = col
 
+        self.index = self.location.index()
+
         self.node = None
         self.numNeighbors = 0
 
-        Cell.sides = {Coord(1, 0), Coord(-1, 0), Coord(0, -1), Coord(0, 1), Coord(-1, 1), Coord(1, 1), Coord(1, -1),
-                      Coord(-1, -1)}
-
         self.neighbors = {
             "A*": set(),
             "allHPA*": set(),
@@ -791,6 +1583,14 @@ class Coord:
         self.y = y
         self.isBig = big
 
+    def toTuple(self):
+        """x and y as a tuple, Coord(tuple) makes coord back"""
+        return self.x, self.y
+
+    def index(self):
+        """flat index of coord into arrays covering every cell in map"""
+        return self.x * settings.numCells[1] + self.y
+
     def getNode(self):
         """return location of node that coord is a part of"""
         if self.x <= settings.cellsInNode[0]:
@@ -839,6 +1639,589 @@ class Coord:
         return "(" + str(self.x) + ", " + str(self.y) + ")"
 
 
+class CSRGraph:
+    """
+    compressed sparse row adjacency, edges leaving cell index i are offsets[i] up to offsets[i + 1]
+
+    Rows replaced with setRow wait in an overlay until pack splices them into the arrays, so a graph patched several
+    times between searches is packed once, and rows that did not change are copied over as whole slices.
+    """
+
+    def __init__(self, size, edges):
+        self.size = size
+        self.overlay = {}  # cell index: edges replacing its row, not packed yet
+
+        self.offsets = array("l", [0] * (size + 1))
+        self.targets = array("l")
+        self.weights = array("l")
+
+        for i in range(size):
+            for target, weight in edges.get(i, ()):
+                self.targets.append(target)
+                self.weights.append(weight)
+            self.offsets[i + 1] = len(self.targets)
+
+    def neighbors(self, i):
+        """yields (neighbor index, edge weight) for edges leaving cell index i"""
+        if i in self.overlay:
+            yield from self.overlay[i]
+            return
+
+        for edge in range(self.offsets[i], self.offsets[i + 1]):
+            yield self.targets[edge], self.weights[edge]
+
+    def setRow(self, i, edges):
+        """replaces edges leaving cell index i with list of (neighbor index, weight), arrays are stale until pack"""
+        self.overlay[i] = edges
+
+    def pack(self):
+        """splices rows waiting in overlay into arrays, called before arrays are read"""
+        if len(self.overlay) == 0:
+            return
+
+        offsets = array("l", self.offsets)
+        targets = array("l")
+        weights = array("l")
+
+        copied = 0  # rows before this one are in new arrays
+        for i in sorted(self.overlay) + [self.size]:
+            # rows from copied up to i did not change, they move by however much rows before them grew or shrank
+            start, end = self.offsets[copied], self.offsets[i]
+            shift = len(targets) - start
+            targets.extend(self.targets[start:end])
+            weights.extend(self.weights[start:end])
+            if shift != 0:
+                offsets[copied + 1:i + 1] = array("l", (offset + shift for offset in self.offsets[copied + 1:i + 1]))
+
+            if i < self.size:
+                for target, weight in self.overlay[i]:
+                    targets.append(target)
+                    weights.append(weight)
+                offsets[i + 1] = len(targets)
+                copied = i + 1
+
+        self.offsets, self.targets, self.weights = offsets, targets, weights
+        self.overlay.clear()
+
+
+class GateTable:
+    """
+    all pairs shortest distances and next hops over HPA* gate graph
+
+    Rows are added as new gates appear and freed when gates go away. Of all gates starting a shortest route, next hop
+    is the one with lowest cell index, so a table depends only on the graph and not on how it got there. When edges
+    are only added or made shorter while every row is up to date, affected pairs are patched in place. Otherwise rows
+    where a changed edge is or was on a shortest route go stale, and are repaired by refresh starting from the cells
+    whose ways in changed, so only the part of a row behind those cells is touched. Queries refresh first.
+    """
+    unreachable = float("inf")
+    repairLimit = 24  # changed or affected rows beyond which searching a row from scratch is faster than repairing it
+
+    def __init__(self):
+        self.rows = {}  # cell index of gate: row
+        self.gates = []  # row: cell index of gate, None if row is free
+        self.free = []  # rows of removed gates, reused by gates added later
+        self.stale = {}  # row: rows whose ways in changed since row was exact, None to search row from scratch
+
+        self.dist = []  # dist[a][b] is shortest distance from gate a to gate b
+        self.hops = []  # hops[a][b] is gate after a on shortest route to b, -1 if there is no route
+
+        self.adjacent = []  # adjacent[a] is dict of row: weight for edges leaving row a
+        self.incoming = []  # incoming[b] is dict of row: weight for edges entering row b
+        self.numEdges = 0
+
+    def covers(self, coord):
+        """True if coord is a gate in table"""
+        return coord.index() in self.rows
+
+    def distance(self, start, target):
+        """shortest distance between gates given as cell indices"""
+        self.refresh()
+        return self.dist[self.rows[start]][self.rows[target]]
+
+    def reachesAny(self, start):
+        """True if gate given as cell index can reach any other gate"""
+        self.refresh()
+        row = self.rows[start]
+        return any(hop != -1 and hop != row for hop in self.hops[row])
+
+    def route(self, start, target):
+        """cell indices of gates on shortest route from start to target, None if there is no route"""
+        self.refresh()
+        a, b = self.rows.get(start), self.rows.get(target)
+        if a is None or b is None or self.dist[a][b] == GateTable.unreachable:
+            return None
+
+        route = [start]
+        while a != b:
+            a = self.hops[a][b]
+            route.append(self.gates[a])
+        return route
+
+    def addGate(self, index):
+        """adds row and column for gate given as cell index, reusing row of a removed gate if there is one"""
+        if len(self.free) > 0:
+            row = self.free.pop()
+            for a in range(len(self.gates)):
+                self.dist[a][row] = GateTable.unreachable
+                self.hops[a][row] = -1
+        else:
+            row = len(self.gates)
+            self.gates.append(None)
+            self.adjacent.append({})
+            self.incoming.append({})
+            for a in range(row):
+                self.dist[a].append(GateTable.unreachable)
+                self.hops[a].append(-1)
+            self.dist.append([GateTable.unreachable] * (row + 1))
+            self.hops.append([-1] * (row + 1))
+
+        self.rows[index] = row
+        self.gates[row] = index
+        self.dist[row][row] = 0
+        self.hops[row][row] = row
+
+    def removeGate(self, index):
+        """removes gate given as cell index along with edges to and from it, its row is freed for next gate added"""
+        row = self.rows[index]
+        gone = {(index, self.gates[b]): None for b in self.adjacent[row]}
+        gone.update({(self.gates[a], index): None for a in self.incoming[row]})
+        self.update(gone)
+
+        del self.rows[index]
+        self.gates[row] = None
+        self.free.append(row)
+        self.stale.pop(row, None)
+        self.dist[row] = [GateTable.unreachable] * len(self.gates)
+        self.hops[row] = [-1] * len(self.gates)
+
+    def update(self, changed, gates=()):
+        """
+        brings table up to date with edges of gate graph that changed
+
+        Parameters:
+            changed -> dict of (gate, gate) as cell indices: new weight of edge between them, None if edge is gone
+            gates -> cell indices of gates that get rows even if they have no edges
+        """
+        for index in gates:
+            if index not in self.rows:
+                self.addGate(index)
+
+        empty = self.numEdges == 0  # nothing to patch yet, faster to search every row from scratch
+        edges = []  # (u, v, weight, previous) as rows
+        for (index, neighbor), weight in changed.items():
+            for gate in (index, neighbor):
+                if gate not in self.rows:
+                    self.addGate(gate)
+
+            u, v = self.rows[index], self.rows[neighbor]
+            previous = self.adjacent[u].get(v)
+            if weight == previous:
+                continue
+            if weight is None:
+                del self.adjacent[u][v]
+                del self.incoming[v][u]
+                self.numEdges -= 1
+            else:
+                if previous is None:
+                    self.numEdges += 1
+                self.adjacent[u][v] = weight
+                self.incoming[v][u] = weight
+            edges.append((u, v, weight, previous))
+
+        if empty:
+            self.stale = dict.fromkeys(self.rows.values())
+        elif len(self.stale) == 0 and all(weight is not None and (previous is None or weight < previous)
+                                          for _, _, weight, previous in edges):
+            for u, v, weight, _ in edges:
+                self.relax(u, v, weight)
+        else:
+            dist = self.dist
+            for u, v, weight, previous in edges:
+                for a in self.rows.values():
+                    if a in self.stale:
+                        if self.stale[a] is not None:
+                            self.stale[a].add(v)  # distances of row are from before, every change counts
+                            if len(self.stale[a]) > GateTable.repairLimit:
+                                self.stale[a] = None
+                        continue
+
+                    # an exact row only changes where edge is or was on a shortest route, ties can move next hops
+                    reach = dist[a][u]
+                    if reach != GateTable.unreachable and \
+                            ((previous is not None and reach + previous == dist[a][v]) or
+                             (weight is not None and reach + weight <= dist[a][v])):
+                        self.stale[a] = {v}
+
+    def refresh(self, deadline=None):
+        """repairs stale rows until there are none or deadline from perf_counter passes"""
+        while len(self.stale) > 0:
+            if deadline is not None and perf_counter() >= deadline:
+                return
+            row, changed = self.stale.popitem()
+            if changed is None:
+                self.searchRow(row)
+            else:
+                self.repairRow(row, changed)
+
+    def rebuild(self):
+        """recomputes every row from scratch"""
+        self.stale = dict.fromkeys(self.rows.values())
+        self.refresh()
+
+    def searchRow(self, source):
+        """recomputes row of source with a Dijkstra search from it, ordered by distance then by cell index of first
+        gate on route so next hops come out lowest among ties"""
+        size = len(self.gates)
+        adjacent, gates = self.adjacent, self.gates
+        dist = [GateTable.unreachable] * size
+        hops = [-1] * size
+        dist[source] = 0
+        hops[source] = source
+
+        frontier = []
+        for neighbor, weight in adjacent[source].items():
+            dist[neighbor] = weight
+            hops[neighbor] = neighbor
+            heappush(frontier, (weight, gates[neighbor], neighbor))
+
+        while frontier:
+            cost, first, current = heappop(frontier)
+            hop = hops[current]
+            if cost > dist[current] or first != gates[hop]:
+                continue
+
+            for neighbor, weight in adjacent[current].items():
+                total = cost + weight
+                if total < dist[neighbor] or (total == dist[neighbor] and first < gates[hops[neighbor]]):
+                    dist[neighbor] = total
+                    hops[neighbor] = hop
+                    heappush(frontier, (total, first, neighbor))
+
+        self.dist[source] = dist
+        self.hops[source] = hops
+
+    def repairRow(self, a, changed):
+        """
+        brings row a up to date when it was exact before ways into rows in changed changed
+
+        Rows whose distance lost every shortest way in are found in order of old distance, they take their best way in
+        from rows that kept theirs and distances spread out from there as in Dijkstra. Next hops are then redone
+        wherever rows moved or ways in changed, and spread along shortest routes for as long as they change.
+        """
+        dist, hops = self.dist[a], self.hops[a]
+        adjacent, incoming = self.adjacent, self.incoming
+        unreachable = GateTable.unreachable
+
+        affected = set()
+        checked = set()
+        frontier = [(dist[v], v) for v in changed if v != a and dist[v] != unreachable]
+        heapify(frontier)
+        while frontier:
+            cost, current = heappop(frontier)
+            if current in checked:
+                continue
+            checked.add(current)
+            if any(dist[w] + weight <= cost for w, weight in incoming[current].items() if w not in affected):
+                continue
+
+            affected.add(current)
+            if len(affected) > GateTable.repairLimit:
+                self.searchRow(a)
+                return
+            for neighbor, weight in adjacent[current].items():
+                if cost + weight == dist[neighbor] and neighbor not in checked:
+                    heappush(frontier, (dist[neighbor], neighbor))
+
+        moved = set()
+        for current in affected.union(changed):
+            if current == a:
+                continue
+            best = min((dist[w] + weight for w, weight in incoming[current].items() if w not in affected),
+                       default=unreachable)
+            if current in affected or best < dist[current]:
+                dist[current] = best
+                moved.add(current)
+                if best != unreachable:
+                    heappush(frontier, (best, current))
+
+        while frontier:
+            cost, current = heappop(frontier)
+            if cost > dist[current]:
+                continue
+            for neighbor, weight in adjacent[current].items():
+                if cost + weight < dist[neighbor]:
+                    dist[neighbor] = cost + weight
+                    moved.add(neighbor)
+                    heappush(frontier, (cost + weight, neighbor))
+
+        # shortest ways into rows that moved, rows after them, and rows in changed may have changed
+        redo = moved.union(changed, *(adjacent[current] for current in moved))
+        redo.discard(a)
+        frontier = [(dist[current], current) for current in redo]
+        heapify(frontier)
+        done = set()
+        while frontier:
+            cost, current = heappop(frontier)
+            if current in done:
+                continue
+            done.add(current)
+
+            hop = self.firstHop(a, current) if cost != unreachable else -1
+            if hop != hops[current] and cost != unreachable:
+                for neighbor, weight in adjacent[current].items():
+                    if cost + weight == dist[neighbor] and neighbor not in done:
+                        heappush(frontier, (dist[neighbor], neighbor))
+            hops[current] = hop
+
+    def firstHop(self, a, b):
+        """lowest cell index gate starting a shortest route from a to b, next hops of rows before b have to be done"""
+        dist, hops, gates = self.dist[a], self.hops[a], self.gates
+        target = dist[b]
+        best = -1
+        for w, weight in self.incoming[b].items():
+            if dist[w] + weight == target:
+                hop = b if w == a else hops[w]
+                if best == -1 or gates[hop] < gates[best]:
+                    best = hop
+        return best
+
+    def relax(self, u, v, weight):
+        """patches pairs whose shortest route improves or ties by using edge u -> v, rows have to be exact"""
+        dist, hops, gates = self.dist, self.hops, self.gates
+        rows = self.rows.values()
+
+        # only routes starting where u -> v helps reach v and ending where it helps from u can change
+        sources = [a for a in rows if dist[a][u] != GateTable.unreachable and dist[a][u] + weight <= dist[a][v]]
+        if len(sources) == 0:
+            return
+        sinks = [b for b in rows if weight + dist[v][b] <= dist[u][b]]
+
+        for a in sources:
+            base = dist[a][u] + weight
+            first = v if a == u else hops[a][u]
+            row, hopRow = dist[a], hops[a]
+            for b in sinks:
+                cost = base + dist[v][b]
+                if cost < row[b] or (cost == row[b] and gates[first] < gates[hopRow[b]]):
+                    row[b] = cost
+                    hopRow[b] = first
+
+
+class Landmarks:
+    """
+    exact distances from a few landmark cells to every cell, used for ALT lower bounds on distance between two cells
+
+    Landmarks are picked so each is as far as possible from those already picked. Distances are not kept up to date,
+    map drops its landmarks when any wall changes, so ALT is only used by testing.benchmark on fixed walls.
+    """
+    unreachable = 0xFFFF
+
+    def __init__(self, gameMap, count, data=None):
+        self.map = gameMap
+        self.landmarks = []
+        self.dist = []
+
+        if data is not None:
+            # restoring from dump
+            for landmark, dist in data:
+                self.landmarks.append(landmark)
+                self.dist.append(array("H", dist))
+            return
+
+        seed = self.bfs(self.firstFree())
+        for _ in range(count):
+            if len(self.dist) == 0:
+                closest = seed
+            else:
+                closest = [min(dist[i] for dist in self.dist) for i in range(len(seed))]
+
+            farthest = max((i for i in range(len(closest)) if closest[i] != Landmarks.unreachable and
+                            self.map.cellList[i].location not in self.map.walls),
+                           key=lambda i: closest[i], default=None)
+
+            if farthest is None or (len(self.dist) > 0 and closest[farthest] == 0):
+                break
+
+            self.landmarks.append(farthest)
+            self.dist.append(self.bfs(farthest))
+
+    def dump(self):
+        """landmarks with their distances as bytes, Landmarks(gameMap, count, data) restores them"""
+        return tuple((landmark, dist.tobytes()) for landmark, dist in zip(self.landmarks, self.dist))
+
+    def firstFree(self):
+        """index of first cell not covered by wall"""
+        for cell in self.map.cellList:
+            if cell.location not in self.map.walls:
+                return cell.index
+
+    def bfs(self, source):
+        """distance from source to every cell, unreachable cells get Landmarks.unreachable"""
+        dist = array("H", [Landmarks.unreachable]) * len(self.map.cellList)
+        dist[source] = 0
+
+        frontier = deque([source])
+        self.spread(dist, frontier)
+        return dist
+
+    def spread(self, dist, frontier):
+        """relaxes distances outwards from cells in frontier until nothing improves"""
+        offsets, targets = self.map.graphs["A*"].offsets, self.map.graphs["A*"].targets
+        cellList = self.map.cellList
+
+        while len(frontier) > 0:
+            current = frontier.popleft()
+            if dist[current] == Landmarks.unreachable:
+                continue
+
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                if dist[current] + 1 < dist[neighbor] and \
+                        self.map.validMove(cellList[current].location, cellList[neighbor].location):
+                    dist[neighbor] = dist[current] + 1
+                    frontier.append(neighbor)
+
+    def estimate(self, index, targetIndex):
+        """lower bound on distance between cells given as indices from triangle inequality over all landmarks"""
+        best = 0
+        for dist in self.dist:
+            a, b = dist[index], dist[targetIndex]
+            if a != Landmarks.unreachable and b != Landmarks.unreachable:
+                if a - b > best:
+                    best = a - b
+                elif b - a > best:
+                    best = b - a
+        return best
+
+
+class Connectivity:
+    """
+    labels connected regions of free cells so whether one cell can reach another is a label comparison
+
+    Labels are merged with union-find when walls are destroyed. When a wall is built, a search from one of its free
+    neighbors checks if the others are still reachable, only regions that were actually cut off get new labels.
+    """
+    blocked = -1
+
+    def __init__(self, gameMap):
+        self.map = gameMap
+        self.parent = []  # union-find over labels
+        self.labels = array("l", [Connectivity.blocked]) * len(gameMap.cellList)
+
+        for cell in gameMap.cellList:
+            if cell.location not in gameMap.walls:
+                self.labels[cell.index] = 0  # free but not labeled yet
+
+        for cell in gameMap.cellList:
+            if self.labels[cell.index] == 0:
+                self.flood(cell.index, self.newLabel())
+
+    def newLabel(self):
+        """makes new label, labels start at 1 so 0 can mark free cells that are not labeled yet"""
+        self.parent.append(len(self.parent) + 1)
+        return len(self.parent)
+
+    def find(self, label):
+        """root label of label"""
+        while self.parent[label - 1] != label:
+            self.parent[label - 1] = self.parent[self.parent[label - 1] - 1]  # path halving
+            label = self.parent[label - 1]
+        return label
+
+    def union(self, a, b):
+        """merges regions with labels a and b"""
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[a - 1] = b
+
+    def canMove(self, a, b):
+        """True if move between neighboring free cell indices is not cut off by walls on both corners"""
+        height = settings.numCells[1]
+        ax, ay = divmod(a, height)
+        bx, by = divmod(b, height)
+        if ax == bx or ay == by:
+            return True
+        return self.labels[ax * height + by] != Connectivity.blocked or \
+            self.labels[bx * height + ay] != Connectivity.blocked
+
+    def neighbors(self, index):
+        """free cell indices that can be reached in one move from index"""
+        graph = self.map.graphs["A*"]
+        for edge in range(graph.offsets[index], graph.offsets[index + 1]):
+            neighbor = graph.targets[edge]
+            if self.labels[neighbor] != Connectivity.blocked and self.canMove(index, neighbor):
+                yield neighbor
+
+    def flood(self, source, label, goals=None):
+        """
+        labels every cell reachable from source, if goals is given stops as soon as all goals are reached and
+        returns True, returns False if region was fully labeled without reaching them
+        """
+        remaining = set(goals) if goals is not None else set()
+        remaining.discard(source)
+        if goals is not None and len(remaining) == 0:
+            return True
+
+        seen = {source}
+        if goals is None:
+            self.labels[source] = label
+        frontier = deque([source])
+
+        while len(frontier) > 0:
+            current = frontier.popleft()
+            for neighbor in self.neighbors(current):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    remaining.discard(neighbor)
+                    if goals is not None and len(remaining) == 0:
+                        return True
+                    if goals is None:
+                        self.labels[neighbor] = label
+                    frontier.append(neighbor)
+
+        if goals is not None:  # region is cut off from remaining goals, it gets its own label
+            for index in seen:
+                self.labels[index] = label
+
+        return False
+
+    def openCell(self, coord):
+        """wall at coord was destroyed, merges regions that now touch"""
+        index = coord.index()
+        if self.labels[index] != Connectivity.blocked:
+            return
+
+        self.labels[index] = self.newLabel()
+        for neighbor in self.neighbors(index):
+            self.union(self.labels[index], self.labels[neighbor])
+
+    def closeCell(self, coord):
+        """wall was built at coord, relabels only regions that got cut off from each other"""
+        index = coord.index()
+        if self.labels[index] == Connectivity.blocked:
+            return
+
+        graph = self.map.graphs["A*"]
+        around = [graph.targets[edge] for edge in range(graph.offsets[index], graph.offsets[index + 1])]
+        self.labels[index] = Connectivity.blocked
+        remaining = [neighbor for neighbor in around if self.labels[neighbor] != Connectivity.blocked]
+
+        # each time a neighbor can't reach the rest, its whole region is split off; the last group keeps old label
+        while len(remaining) > 1:
+            first = remaining[0]
+            if self.flood(first, self.newLabel(), remaining):
+                break
+            remaining = [neighbor for neighbor in remaining if self.labels[neighbor] != self.labels[first]]
+
+    def connected(self, a, b):
+        """True if coords a and b are free and a path exists between them"""
+        labelA, labelB = self.labels[a.index()], self.labels[b.index()]
+        if labelA == Connectivity.blocked or labelB == Connectivity.blocked:
+            return False
+        return self.find(labelA) == self.find(labelB)
+
+
 class Path(list):
     """stores path to be traversed as list"""
 
@@ -855,6 +2238,8 @@ class Path(list):
 
         self.failed = False
         self.trapped = False
+        self.waits = False  # repeated points are waits planned by cooperativeSearch, not just points met twice
+        self.stats = None  # SearchStats of search that made path
 
         self.refCount = 0
 
@@ -904,25 +2289,518 @@ class Path(list):
         self.end = self[-1]
 
 
-class CoordMap(dict):
-    """contains coords for every cell in map, assigns boolean values to each coord"""
+class ReversedPath:
+    """read only view of a path in reverse order, used for precomputed paths so reverse combos need no copy"""
+
+    def __init__(self, path):
+        self.source = path
+
+        self.failed = path.failed
+        self.trapped = False
+
+        self.refCount = 0
+
+    @property
+    def start(self):
+        return self.source.end
+
+    @property
+    def end(self):
+        return self.source.start
+
+    def __len__(self):
+        return len(self.source)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.source)
+        return self.source[len(self.source) - 1 - i]
+
+    def __iter__(self):
+        return reversed(self.source)
+
+
+class SegmentedPath:
+    """
+    path made of segments referring to other paths (usually precomputed gate paths) instead of copying their points
+
+    Points are consumed through a cursor so get() is O(1), use flatten() when an actual list of points is needed.
+    Source paths must not be modified while a segmented path refers to them.
+    """
+
+    def __init__(self, path=None):
+        self.segments = []  # (source, indices into source)
+
+        # cursor
+        self.segment = 0
+        self.position = 0
+
+        self.length = 0
+        self.end = None
+
+        self.failed = False
+        self.trapped = False
+        self.waits = False
+        self.stats = None
+
+        self.refCount = 0
+
+        if path is not None:
+            self.extend(path)
+            self.failed = path.failed
+
+    @property
+    def start(self):
+        """point under cursor"""
+        if self.length == 0:
+            return None
+        source, indices = self.segments[self.segment]
+        return source[indices[self.position]]
+
+    def addSegment(self, path, count=None):
+        """adds first count points of path (all if count is None) as a segment, reversed views resolve to source"""
+        if count is None:
+            count = len(path)
+
+        if count <= 0:
+            return
+
+        if isinstance(path, ReversedPath):
+            last = len(path.source) - 1
+            source, indices = path.source, range(last, last - count, -1)
+        else:
+            source, indices = path, range(count)
+
+        self.segments.append((source, indices))
+        self.length += count
+        self.end = source[indices[-1]]
+
+    def extend(self, path):
+        """appends all remaining points in path, segments of another segmented path are shared rather than copied"""
+        if isinstance(path, SegmentedPath):
+            for i in range(path.segment, len(path.segments)):
+                source, indices = path.segments[i]
+                if i == path.segment:
+                    indices = indices[path.position:]
+                if len(indices) > 0:
+                    self.segments.append((source, indices))
+                    self.length += len(indices)
+                    self.end = source[indices[-1]]
+        else:
+            self.addSegment(path)
+
+        if path.trapped:
+            self.trapped = True
+
+    def get(self):
+        """returns point under cursor and advances cursor"""
+        source, indices = self.segments[self.segment]
+        value = source[indices[self.position]]
+
+        self.length -= 1
+        self.position += 1
+        if self.position == len(indices):
+            self.segment += 1
+            self.position = 0
+
+        return value
+
+    def peek(self):
+        """returns but does not consume point under cursor"""
+        return self.start
+
+    def fail(self):
+        """flags path as unsuccessful"""
+        self.failed = True
+
+    def isEmpty(self):
+        """True if no points left in path"""
+        return self.length == 0
+
+    def flatten(self):
+        """copies remaining points into a regular Path"""
+        path = Path()
+        for pt in self:
+            path.add(pt)
+        path.failed = self.failed
+        path.trapped = self.trapped
+        return path
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for i in range(self.segment, len(self.segments)):
+            source, indices = self.segments[i]
+            if i == self.segment:
+                indices = indices[self.position:]
+            for j in indices:
+                yield source[j]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("SegmentedPath index out of range...")
+
+        for j in range(self.segment, len(self.segments)):
+            source, indices = self.segments[j]
+            if j == self.segment:
+                indices = indices[self.position:]
+            if i < len(indices):
+                return source[indices[i]]
+            i -= len(indices)
+
+
+class WaypointPath:
+    """
+    path stored as waypoints joined by straight lines of cells, cells of a line are only made once it is walked
+
+    Behaves like Path for consuming, iterating, and length, which counts cells. Only waypoints are marked in CountMap,
+    reached tells if last point from get() was a waypoint so its mark can be removed.
+    """
+
+    def __init__(self, waypoints):
+        self.waypoints = list(waypoints)
+
+        # cursor, next waypoint to reach and cells of line towards it
+        self.next = 0
+        self.line = []
+        self.step = 0
+
+        self.length = 1 + sum(max(abs(b.x - a.x), abs(b.y - a.y)) for a, b in zip(self.waypoints, self.waypoints[1:]))
+        self.end = self.waypoints[-1]
+
+        self.reached = False
+        self.failed = False
+        self.trapped = False
+        self.waits = False
+        self.stats = None
+
+        self.refCount = 0
+
+    @property
+    def start(self):
+        """point under cursor"""
+        if self.length == 0:
+            return None
+        if self.next == 0:
+            return self.waypoints[0]
+        if self.step == len(self.line):
+            self.line = Map.lineCells(self.waypoints[self.next - 1], self.waypoints[self.next])
+            self.step = 0
+        return self.line[self.step]
+
+    def get(self):
+        """returns point under cursor and advances cursor"""
+        value = self.start
+        self.length -= 1
+
+        if self.next == 0:
+            self.reached = True
+            self.next = 1
+        else:
+            self.step += 1
+            self.reached = self.step == len(self.line)
+            if self.reached:
+                self.next += 1
+
+        return value
+
+    def peek(self):
+        """returns but does not consume point under cursor"""
+        return self.start
+
+    def remainingWaypoints(self):
+        """waypoints not reached yet, these are the points marked in CountMap"""
+        return self.waypoints[self.next:]
+
+    def fail(self):
+        """flags path as unsuccessful"""
+        self.failed = True
+
+    def isEmpty(self):
+        """True if no points left in path"""
+        return self.length == 0
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        if self.length == 0:
+            return
+        if self.next == 0:
+            yield self.waypoints[0]
+            first = 1
+        else:
+            yield from self.line[self.step:]
+            first = self.next + 1 if self.step < len(self.line) else self.next
+
+        for i in range(max(first, 1), len(self.waypoints)):
+            yield from Map.lineCells(self.waypoints[i - 1], self.waypoints[i])
+
+
+class CountMap:
+    """array backed grid counting how many paths cross each cell, keeps running total of occupied cells"""
 
     def __init__(self):
-        dict.__init__(self)
-        self.size = 0
+        self.size = settings.numCells[0] * settings.numCells[1]
+        self.counts = array("H", bytes(2 * self.size))
+        self.occupied = 0
 
-        for x in range(settings.numCells[0]):
-            for y in range(settings.numCells[1]):
-                self[Coord(x, y)] = False
-                self.size += 1
+    def add(self, coord):
+        """registers one more path crossing coord"""
+        i = coord.index()
+        if self.counts[i] == 0:
+            self.occupied += 1
+        self.counts[i] += 1
+
+    def remove(self, coord):
+        """unregisters one path crossing coord, never drops below zero"""
+        i = coord.index()
+        if self.counts[i] > 0:
+            self.counts[i] -= 1
+            if self.counts[i] == 0:
+                self.occupied -= 1
+
+    def addPath(self, path):
+        """registers every point in path, only waypoints of WaypointPaths"""
+        for pt in (path.remainingWaypoints() if isinstance(path, WaypointPath) else path):
+            self.add(pt)
+
+    def removePath(self, path):
+        """unregisters every point in path, only waypoints of WaypointPaths"""
+        for pt in (path.remainingWaypoints() if isinstance(path, WaypointPath) else path):
+            self.remove(pt)
 
     def percentFull(self):
-        """percentage of cells whole value is True"""
-        c = 0
-        for pt in self.values():
-            if pt:
-                c += 1
-        return c / self.size * 100
+        """percentage of cells crossed by at least one path"""
+        return self.occupied / self.size * 100
+
+    def __getitem__(self, coord):
+        """number of paths crossing coord, truthy if any"""
+        return self.counts[coord.index()]
+
+
+class PathInvalidator:
+    """
+    Indexes enemy paths by nodes they cross and node they end in, so events that make paths stale mark only enemies they
+    affect rather than every enemy being checked every frame. Marked enemies are collected with take.
+
+    Events:
+        path set or run out -> an empty path is marked straight away so enemy searches again
+        wall built or destroyed -> enemies whose paths cross nodes around wall, destroyed walls also give enemies walled
+            off from player another try
+        player moves into another node -> enemies whose paths end replanDistance or more nodes away
+    """
+
+    def __init__(self, replanDistance=2):
+        self.replanDistance = replanDistance
+
+        # dicts are used as ordered sets of enemies so enemies are marked in same order every run
+        self.crossing = {}  # node: enemies whose paths cross node
+        self.ending = {}  # node: enemies whose paths end in node
+        self.nodesOf = {}  # enemy: (nodes its path crosses, node its path ends in)
+        self.unreachable = {}  # enemies walled off from player
+        self.marked = {}
+
+    def track(self, enemy, path):
+        """indexes enemy's new path in place of its old one, clears any mark since enemy has just been given a path"""
+        self.untrack(enemy)
+
+        if path is None or len(path) == 0:
+            self.mark(enemy)
+            return
+
+        nodes = {pt.getNode() for pt in path}
+        end = path.end.getNode()
+        for node in nodes:
+            self.crossing.setdefault(node, {})[enemy] = None
+        self.ending.setdefault(end, {})[enemy] = None
+        self.nodesOf[enemy] = (nodes, end)
+
+    def untrack(self, enemy):
+        """forgets path and any mark of enemy, called when it gets a new path or dies so take never returns dead
+        enemies"""
+        nodes, end = self.nodesOf.pop(enemy, ((), None))
+        for node in nodes:
+            self.crossing[node].pop(enemy, None)
+        if end is not None and end in self.ending:
+            self.ending[end].pop(enemy, None)
+        self.unreachable.pop(enemy, None)
+        self.marked.pop(enemy, None)
+
+    def mark(self, enemy):
+        """enemy needs a new path"""
+        self.marked[enemy] = None
+
+    def waitForWalls(self, enemy):
+        """enemy can not reach player, it is marked again once a wall is destroyed"""
+        self.unreachable[enemy] = None
+
+    def wallChanged(self, coord, destroyed):
+        """marks enemies whose paths cross nodes touching coord or its neighbors, which are the paths a wall built on
+        coord can block and a wall destroyed there can shorten"""
+        nodes = {(coord + (dx, dy)).getNode() for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                 if settings.isInCellMap(coord + (dx, dy))}
+        for node in nodes:
+            for enemy in self.crossing.get(node, ()):
+                self.mark(enemy)
+
+        if destroyed:
+            for enemy in self.unreachable:
+                self.mark(enemy)
+            self.unreachable.clear()
+
+    def playerMoved(self, node):
+        """marks enemies whose paths end replanDistance or more nodes away from node player moved into"""
+        for end in list(self.ending):
+            if max(abs(end.x - node.x), abs(end.y - node.y)) >= self.replanDistance:
+                for enemy in self.ending.pop(end):
+                    self.mark(enemy)
+
+    def take(self):
+        """returns marked enemies in order they were marked and clears marks"""
+        marked = list(self.marked)
+        self.marked.clear()
+        return marked
+
+    def dump(self, indexOf):
+        """
+        indexed paths and marks as primitive tuples, enemies are saved as their index from indexOf and kept in order
+        they were added, since that is the order they get marked in
+
+        Parameters:
+            indexOf -> dict of enemy: index, enemies not in it are dead and left out
+        """
+        def indices(enemies):
+            return tuple(indexOf[enemy] for enemy in enemies if enemy in indexOf)
+
+        return (tuple((node.toTuple(), indices(enemies)) for node, enemies in self.crossing.items()),
+                tuple((node.toTuple(), indices(enemies)) for node, enemies in self.ending.items()),
+                tuple((indexOf[enemy], tuple(node.toTuple() for node in nodes), end.toTuple())
+                      for enemy, (nodes, end) in self.nodesOf.items() if enemy in indexOf),
+                indices(self.unreachable),
+                indices(self.marked))
+
+    def load(self, data, enemies):
+        """replaces index with one made by dump, enemies is list of enemies dump gave indices into"""
+        crossing, ending, nodesOf, unreachable, marked = data
+        self.crossing = {Coord(node): dict.fromkeys(enemies[i] for i in indices) for node, indices in crossing}
+        self.ending = {Coord(node): dict.fromkeys(enemies[i] for i in indices) for node, indices in ending}
+        self.nodesOf = {enemies[i]: ({Coord(node) for node in nodes}, Coord(end)) for i, nodes, end in nodesOf}
+        self.unreachable = dict.fromkeys(enemies[i] for i in unreachable)
+        self.marked = dict.fromkeys(enemies[i] for i in marked)
+
+
+class OccupancyGrid:
+    """one byte per cell marking walls and one byte per cell of legal moves out of it, indexed like Coord.index"""
+
+    # offsets of the eight moves out of a cell, move i is bit 1 << i of a mask
+    moves = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+    # bit of move dx, dy is at (dx + 1) * 3 + dy + 1, staying put is never a legal move
+    moveBits = (1, 2, 4, 8, 0, 16, 32, 64, 128)
+
+    def __init__(self):
+        self.width, self.height = settings.numCells
+        self.cells = bytearray(self.width * self.height)
+        self.masks = bytearray(self.width * self.height)
+
+        for x in range(self.width):
+            for y in range(self.height):
+                self.updateMask(x, y)
+
+    def set(self, coord, blocked):
+        """marks coord as wall or free, moves out of cells around it are updated"""
+        self.setCell(coord.x, coord.y, blocked)
+
+    def setCell(self, x, y, blocked):
+        value = 1 if blocked else 0
+        if self.cells[x * self.height + y] == value:
+            return
+
+        self.cells[x * self.height + y] = value
+
+        # cell decides moves onto itself and diagonal moves of its neighbors that cut its corner
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if 0 <= x + dx < self.width and 0 <= y + dy < self.height:
+                    self.updateMask(x + dx, y + dy)
+
+    def fill(self, walls):
+        """makes walls the only walls in grid, only cells that change are touched"""
+        indices = {wall.index() for wall in walls}
+
+        for index, blocked in enumerate(self.cells):
+            if blocked and index not in indices:
+                self.setCell(index // self.height, index % self.height, False)
+
+        for index in indices:
+            self.setCell(index // self.height, index % self.height, True)
+
+    def updateMask(self, x, y):
+        """works out legal moves out of x, y, a move must stay on map and not end on a wall or squeeze between two"""
+        mask = 0
+        for bit, (dx, dy) in enumerate(self.moves):
+            if not 0 <= x + dx < self.width or not 0 <= y + dy < self.height or self.blocked(x + dx, y + dy):
+                continue
+            if dx == 0 or dy == 0 or not (self.blocked(x + dx, y) and self.blocked(x, y + dy)):
+                mask |= 1 << bit
+        self.masks[x * self.height + y] = mask
+
+    def canMove(self, current, nextMove):
+        """True if moving from current to nextMove, a cell next to it, is legal"""
+        bit = self.moveBits[(nextMove.x - current.x + 1) * 3 + nextMove.y - current.y + 1]
+        return self.masks[current.x * self.height + current.y] & bit != 0
+
+    def legal(self, x, y, dx, dy):
+        """True if moving by dx, dy from x, y is legal, takes plain numbers so nothing is allocated"""
+        return self.masks[x * self.height + y] & self.moveBits[(dx + 1) * 3 + dy + 1] != 0
+
+    def blocked(self, x, y):
+        """True if cell at x, y is a wall, cells off map are never walls"""
+        return 0 <= x < self.width and 0 <= y < self.height and self.cells[x * self.height + y] == 1
+
+    def trace(self, start, end):
+        """
+        first wall cell crossed by segment from start to end, both in pixels, None if segment is clear
+
+        Steps through every cell the segment crosses in order (grid DDA), so cost depends on cells crossed rather than
+        on how many walls there are, and fast movement can not skip over a wall.
+        """
+        x0, y0 = start.x / settings.gridSize[0], start.y / settings.gridSize[1]
+        x1, y1 = end.x / settings.gridSize[0], end.y / settings.gridSize[1]
+
+        x, y = math.floor(x0), math.floor(y0)
+        endX, endY = math.floor(x1), math.floor(y1)
+
+        dx, dy = x1 - x0, y1 - y0
+        stepX = 1 if dx > 0 else -1
+        stepY = 1 if dy > 0 else -1
+
+        # distance along segment, as a fraction of it, to next vertical and horizontal grid line and between them
+        deltaX = abs(1 / dx) if dx != 0 else math.inf
+        deltaY = abs(1 / dy) if dy != 0 else math.inf
+        nextX = ((x + 1 - x0) if dx > 0 else (x0 - x)) * deltaX if dx != 0 else math.inf
+        nextY = ((y + 1 - y0) if dy > 0 else (y0 - y)) * deltaY if dy != 0 else math.inf
+
+        while True:
+            if self.blocked(x, y):
+                return Coord(x, y)
+
+            if (x == endX and y == endY) or min(nextX, nextY) > 1:
+                return None
+
+            if nextX < nextY:
+                x += stepX
+                nextX += deltaX
+            else:
+                y += stepY
+                nextY += deltaY
+
+    def __contains__(self, coord):
+        return self.blocked(coord.x, coord.y)
 
 
 class Reference:
@@ -948,3 +2826,216 @@ class Reference:
 
     def __repr__(self):
         return self.obj.__repr__()
+
+
+class SearchWorkspace:
+    """
+    flat arrays indexed by cell reused by every search of a map. Each search starts a new generation and an entry only
+    counts if its stamp holds current generation, so nothing has to be cleared between searches
+    """
+
+    def __init__(self, size):
+        self.cost = [0] * size  # g cost of reaching cell
+        self.parent = [0] * size  # index of cell it was reached from
+        self.reached = [0] * size  # generation cell was last reached in
+        self.closed = [0] * size  # generation cell was last expanded in
+        self.generation = 0
+
+    def begin(self):
+        """starts a new search, every cell counts as unreached, returns its generation"""
+        self.generation += 1
+        return self.generation
+
+
+class SearchStats:
+    """
+    record of what one search did, attached to path it returned as path.stats
+
+    Outcomes:
+        found -> reached target
+        altTarget -> target not reachable, path leads to one of alt targets instead
+        gateTable -> HPA* answered by walking precomputed gate table without searching
+        aborted -> gave up after searching as many cells as abort allowed
+        exhausted -> ran out of cells to search, target is walled off
+        noMoves -> start has no legal moves
+        blocked -> target is a wall or is start, nothing was searched
+    """
+
+    def __init__(self, searchType):
+        self.searchType = searchType
+        self.outcome = None
+        self.expanded = 0  # cells taken off frontier
+        self.frontierPeak = 0  # most entries frontier held at once
+        self.heuristicCalls = 0  # distance estimates computed, stays 0 for breadth first searches
+        self.seconds = 0
+        self.bound = None  # path is at most this many times longer than shortest path, None if search gave no bound
+
+        self.began = perf_counter()
+
+    def attach(self, path, outcome, expanded=0, heuristicCalls=0, frontierPeak=0):
+        """fills in record as search returns path, returns path with record attached"""
+        self.outcome = outcome
+        self.expanded = expanded
+        self.heuristicCalls = heuristicCalls
+        self.frontierPeak = frontierPeak
+        self.seconds = perf_counter() - self.began
+
+        path.stats = self
+        return path
+
+    def absorb(self, stats):
+        """adds in search made to finish this one, its outcome becomes outcome of this search"""
+        self.outcome = stats.outcome
+        self.expanded += stats.expanded
+        self.heuristicCalls += stats.heuristicCalls
+        self.frontierPeak = max(self.frontierPeak, stats.frontierPeak)
+        self.seconds = perf_counter() - self.began
+
+
+class SearchLog:
+    """
+    search stats totaled wave by wave, summaries show where search time goes when tuning search settings
+
+    Only running totals are kept for each wave, so log stays the same size however many searches a wave makes.
+    """
+
+    def __init__(self):
+        self.waves = {}  # wave number: totals of searches made in wave
+
+    def add(self, wave, stats):
+        """folds stats of one search into totals of wave"""
+        totals = self.waves.get(wave)
+        if totals is None:
+            totals = self.waves[wave] = {"searches": 0, "seconds": 0, "maxSeconds": 0, "expanded": 0,
+                                         "maxExpanded": 0, "maxFrontier": 0, "heuristicCalls": 0,
+                                         "outcomes": {}, "searchTypes": {}}
+
+        totals["searches"] += 1
+        totals["seconds"] += stats.seconds
+        totals["maxSeconds"] = max(totals["maxSeconds"], stats.seconds)
+        totals["expanded"] += stats.expanded
+        totals["maxExpanded"] = max(totals["maxExpanded"], stats.expanded)
+        totals["maxFrontier"] = max(totals["maxFrontier"], stats.frontierPeak)
+        totals["heuristicCalls"] += stats.heuristicCalls
+        totals["outcomes"][stats.outcome] = totals["outcomes"].get(stats.outcome, 0) + 1
+        totals["searchTypes"][stats.searchType] = totals["searchTypes"].get(stats.searchType, 0) + 1
+
+    def summary(self, wave=None):
+        """dict of totals, means, and maxima over searches of wave, or of every wave if wave is None"""
+        if wave is None:
+            waves = list(self.waves.values())
+        else:
+            waves = [self.waves[wave]] if wave in self.waves else []
+
+        searches = sum(totals["searches"] for totals in waves)
+        seconds = sum(totals["seconds"] for totals in waves)
+        count = max(searches, 1)
+        outcomes = {}
+        types = {}
+        for totals in waves:
+            for outcome, num in totals["outcomes"].items():
+                outcomes[outcome] = outcomes.get(outcome, 0) + num
+            for searchType, num in totals["searchTypes"].items():
+                types[searchType] = types.get(searchType, 0) + num
+
+        return {
+            "searches": searches,
+            "totalMs": round(1000 * seconds, 3),
+            "meanMs": round(1000 * seconds / count, 4),
+            "maxMs": round(1000 * max((totals["maxSeconds"] for totals in waves), default=0), 3),
+            "meanExpanded": round(sum(totals["expanded"] for totals in waves) / count, 2),
+            "maxExpanded": max((totals["maxExpanded"] for totals in waves), default=0),
+            "maxFrontier": max((totals["maxFrontier"] for totals in waves), default=0),
+            "heuristicCalls": sum(totals["heuristicCalls"] for totals in waves),
+            "outcomes": outcomes,
+            "searchTypes": types,
+        }
+
+
+class ReservationTable:
+    """records which agent occupies which cell at which step, steps are roughly the time it takes to cross one tile"""
+
+    def __init__(self, window):
+        self.window = window
+        self.time = 0
+
+        self.cells = {}  # step: {coord: agent}
+        self.agents = {}  # agent: [(step, coord)]
+
+    def now(self):
+        """current step"""
+        return int(self.time)
+
+    def advance(self, steps):
+        """moves clock forward, forgets reservations that are in the past"""
+        before = self.now()
+        self.time += steps
+
+        if self.now() != before:
+            for step in range(before, self.now()):
+                self.cells.pop(step, None)
+
+            for agent in [agent for agent, held in self.agents.items() if held[-1][0] < self.now()]:
+                del self.agents[agent]
+
+    def reserve(self, agent, path):
+        """reserves points of path for agent, first point at current step, stops after window steps"""
+        self.release(agent)
+
+        held = []
+        step = self.now()
+
+        for pt in islice(path, self.window + 1):
+            bucket = self.cells.setdefault(step, {})
+            if pt not in bucket:
+                bucket[pt] = agent
+                held.append((step, pt))
+            step += 1
+
+        if len(held) > 0:
+            self.agents[agent] = held
+
+    def dump(self, indexOf):
+        """clock and reservations as primitive tuples, agents are saved as their index from indexOf and agents not in
+        it are left out"""
+        return (self.time,
+                tuple((indexOf[agent], tuple((step, pt.toTuple()) for step, pt in held))
+                      for agent, held in self.agents.items() if agent in indexOf))
+
+    def load(self, data, agents):
+        """replaces reservations with ones made by dump, agents is list of agents dump gave indices into"""
+        self.time, reservations = data
+        self.cells = {}
+        self.agents = {}
+        for i, held in reservations:
+            agent = agents[i]
+            self.agents[agent] = [(step, Coord(pt)) for step, pt in held]
+            for step, pt in self.agents[agent]:
+                self.cells.setdefault(step, {})[pt] = agent
+
+    def release(self, agent):
+        """removes all reservations held by agent"""
+        for step, pt in self.agents.pop(agent, ()):
+            bucket = self.cells.get(step)
+            if bucket is not None and bucket.get(pt) is agent:
+                del bucket[pt]
+
+    def owner(self, coord, step):
+        """agent that reserved coord at step, None if free"""
+        bucket = self.cells.get(step)
+        if bucket is None:
+            return None
+        return bucket.get(coord)
+
+    def canMove(self, current, nextMove, step, agent):
+        """True if agent can go from current at step to nextMove at step + 1 without running into another agent"""
+        blocking = self.owner(nextMove, step + 1)
+        if blocking is not None and blocking is not agent:
+            return False
+
+        # two agents swapping cells would pass through each other
+        oncoming = self.owner(nextMove, step)
+        if oncoming is not None and oncoming is not agent and oncoming is self.owner(current, step + 1):
+            return False
+
+        return True
@@ -3,8 +3,9 @@ Author: Grant Holmes
 Contact: g.holmes429@gmail.com
 Date: 08/16/2020
 
-Handles and manages basic GUI and blitting to screen. Also initializes pygame and maintains frame rate/ allows for
-frame rate independence through dt.
+Handles and manages basic GUI and blitting to screen. Also initializes pygame and maintains frame rate. Game logic runs
+in fixed simulation ticks of dt, as many per rendered frame as time has passed, or as many as fit in a frame while fast
+forwarding.
 
 Classes:
     GameEngine
@@ -14,45 +15,74 @@ import pygame
 from data.assets import colors
 from data import settings
 
+from time import perf_counter
+
 
 class GameEngine:
     """
     Handles GUI and frame rate
     """
-    clock = pygame.time.Clock()
-    running = True
 
     def __init__(self):
         pygame.init()
         pygame.font.init()
 
+        self.clock = pygame.time.Clock()
+        self.running = True
+
         self.screen = pygame.display.set_mode(settings.screenSize)
         self.background = None
 
         self.font = pygame.font.SysFont("impact", 28)
         self.smallFont = pygame.font.SysFont("impact", 20)
 
-        self.dt = None
+        # fixed timestep, dt is the same for every tick
+        self.dt = settings.normalizedFrameRate / settings.simTickRate
+        self.accumulator = 0  # sim ticks owed, fraction left after running ticks is used to interpolate drawing
+        self.fastForward = False
 
         self.windows = {}
         pygame.display.set_caption(settings.gameName)
 
     def handleEvents(self):
-        """Checks to see if X is clicked"""
+        """Checks to see if X is clicked, space toggles fast forward"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
                 pygame.quit()
 
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                self.fastForward = not self.fastForward
+                self.accumulator = 0
+
     def keepRunning(self):
-        """Checks to see if game should still run, updates frame rate"""
+        """Checks to see if game should still run, updates frame rate and adds time passed to sim ticks owed"""
         self.handleEvents()
 
-        # dt is milliseconds passed between frames
-        self.dt = self.clock.tick(settings.targetFrameRate) / 1000 * settings.normalizedFrameRate
+        if self.fastForward:
+            self.clock.tick()
+        else:
+            seconds = self.clock.tick(settings.targetFrameRate) / 1000
+            self.accumulator = min(self.accumulator + seconds * settings.simTickRate, settings.maxTicksPerFrame)
 
         return self.running
 
+    def ticks(self):
+        """yields once for every sim tick to run this frame, while fast forwarding ticks run until frame time is used"""
+        if self.fastForward:
+            deadline = perf_counter() + 1 / settings.targetFrameRate
+            yield
+            while perf_counter() < deadline:
+                yield
+        else:
+            while self.accumulator >= 1:
+                self.accumulator -= 1
+                yield
+
+    def alpha(self):
+        """how far between last two ticks sprites should be drawn"""
+        return 1 if self.fastForward else self.accumulator
+
     def clearScreen(self):
         """clears and resets game windows"""
         self.screen.blit(self.background, (0, 0))
@@ -75,6 +105,8 @@ class GameEngine:
         """displays current frames per second on screen, marker of performance"""
         fps = int(self.clock.get_fps())
         output = " FPS: " + str(fps) + " "
+        if self.fastForward:
+            output += ">> "
         text = self.smallFont.render(output, True, colors["black"], colors["lightBlue"])
         textRect = text.get_rect()
         textRect.center = (
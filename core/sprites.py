@@ -5,10 +5,13 @@ Date: 08/16/2020
 
 Manages creating, handling, updating, and deleting sprites through SpriteEngine. Sprite classes derived from
 pygame.sprite.Sprite. Sprite and MovingSprite classes are derived from this to make base classes for actually sprites
-seen in game.
+seen in game. Enemy state lives in NumPy arrays in EnemyStore so every enemy is measured and moved in one step.
+Enemies and bullets are recycled through SpritePools instead of being rebuilt for every spawn.
 
 Classes:
     SpriteEngine
+    SpritePool
+    EnemyStore
     Sprite
     MovingSprite
     Player
@@ -18,20 +21,22 @@ Classes:
 
 """
 
-from data.peripherals import getKey
-from core.board import CoordMap, Coord
+from core.board import CountMap, Coord, Path, WaypointPath, OccupancyGrid, PathInvalidator
 from data.assets import colors
 from data import settings
 
 import pygame.sprite
 from pygame import Surface, Rect
+import numpy
 import math
 
 
 class SpriteEngine:
     """manages spawning and storing all sprites"""
 
-    def __init__(self):
+    def __init__(self, controller):
+        self.controller = controller  # input given to player
+
         self.all = pygame.sprite.Group()
 
         self.enemies = pygame.sprite.Group()
@@ -39,81 +44,341 @@ class SpriteEngine:
         self.bullets = pygame.sprite.Group()
 
         self.walls = {}
+        self.occupancy = OccupancyGrid()  # same walls as byte per cell with legal moves, for bullets and movement
         self.destroyedWalls = []
         self.wallCount = 0
 
         self.enemiesKilled = 0
+        self.killedEnemies = []  # enemies destroyed during last collision check
 
-    def update(self, dt):
-        """updates each enemies dist away from player to optimize search priority then calls each sprites update func"""
+        # enemy state shared by enemies of this game only
+        self.enemyStore = EnemyStore()
+        self.pathMap = CountMap()  # how many enemy paths cross each cell
+        self.invalidator = PathInvalidator()  # marks enemies whose paths go stale, told of every wall change
+        self.enemyLocations = set()
 
-        for enemy in self.enemies:
-            dx = self.player.sprite.location.x - enemy.location.x
-            dy = self.player.sprite.location.y - enemy.location.y
-            enemy.distToPlayer = math.sqrt(dx ** 2 + dy ** 2)
+        self.enemyPool = SpritePool(lambda coord, health, speed: Enemy(coord, health, speed, self))
+        self.bulletPool = SpritePool(Bullet)
 
-            if enemy.path is not None and enemy.path.end is not None:
-                dx = self.player.sprite.location.x - enemy.path.end.x
-                dy = self.player.sprite.location.y - enemy.path.end.y
-                enemy.pathError = math.sqrt(dx ** 2 + dy ** 2)
+        # rect positions before last sim tick, and current positions of sprites moved for drawing
+        self.prevPositions = {}
+        self.drawnPositions = []
 
-        self.all.update(dt, self.walls.keys())
+    def update(self, dt):
+        """updates every enemies dist away from player to optimize search priority, calls each sprites update func, then
+        moves all enemies at once"""
+        if len(self.enemies) > 0:
+            self.enemyStore.measure(self.player.sprite.location)
+        self.all.update(dt, self.occupancy)
+        self.enemyStore.move(dt)
 
     def checkCollisions(self):
         """checks for and handles collisions bt player, enemies, bullets, and walls"""
         self.destroyedWalls.clear()
+        self.killedEnemies.clear()
 
-        if len(pygame.sprite.groupcollide(self.enemies, self.player, True, False)) > 0:
+        enemiesCollided = pygame.sprite.groupcollide(self.enemies, self.player, False, False)
+        if len(enemiesCollided) > 0:
             self.getPlayer().health -= 1
+            for enemy in enemiesCollided:
+                enemy.destroy()
+                self.killedEnemies.append(enemy)
 
         enemiesHit = pygame.sprite.groupcollide(self.enemies, self.bullets, False, True)
         for enemy in enemiesHit.keys():
             enemy.getHit()
             if len(enemy.groups()) <= 0:
                 self.enemiesKilled += 1
+                self.killedEnemies.append(enemy)
 
-        wallsHit = pygame.sprite.groupcollide(self.walls.values(), self.bullets, False, True)
-        for wall, bullet in wallsHit.items():
-            wall.getHit()
+        if settings.continuousBullets:
+            for bullet in self.bullets.sprites():
+                hit = self.occupancy.trace(bullet.prevPos, bullet.pos)
+                if hit is not None:
+                    bullet.kill()
+                    self.hitWall(self.walls[hit])
+
+        else:
+            wallsHit = pygame.sprite.groupcollide(self.walls.values(), self.bullets, False, True)
+            for wall, bullet in wallsHit.items():
+                self.hitWall(wall)
+
+    def hitWall(self, wall):
+        """damages wall, destroys it once it has no health left"""
+        wall.getHit()
+
+        if wall.health <= 0:
+            self.destroyedWalls.append(wall.location)
+            self.deleteWall(wall.location)
+
+    def savePositions(self):
+        """remembers where every sprite is before a sim tick"""
+        self.prevPositions = {sprite: sprite.rect.topleft for sprite in self.all}
+
+    def interpolate(self, alpha):
+        """moves sprites alpha of the way from where they were before last tick to where they are now, for drawing"""
+        self.drawnPositions.clear()
+        if alpha >= 1:
+            return
 
-            if wall.health <= 0:
-                self.destroyedWalls.append(wall.location)
-                self.deleteWall(wall.location)
+        for sprite, prev in self.prevPositions.items():
+            current = sprite.rect.topleft
+            if current != prev and sprite.alive():
+                self.drawnPositions.append((sprite, current))
+                sprite.rect.topleft = (round(prev[0] + (current[0] - prev[0]) * alpha),
+                                       round(prev[1] + (current[1] - prev[1]) * alpha))
+
+    def restorePositions(self):
+        """puts sprites moved by interpolate back where simulation has them"""
+        for sprite, current in self.drawnPositions:
+            sprite.rect.topleft = current
+        self.drawnPositions.clear()
 
     def getPlayer(self):
         """returns player sprite"""
         return self.player.sprite
 
+    def dump(self):
+        """walls, player, enemies, and bullets as primitive tuples"""
+        player = self.getPlayer()
+        return (tuple((coord.toTuple(), wall.health) for coord, wall in self.walls.items()),
+                tuple(coord.toTuple() for coord in self.destroyedWalls),
+                self.enemiesKilled,
+                None if player is None else (player.dumpMovement(), player.health, player.speed),
+                tuple(enemy.dump() for enemy in self.enemies),
+                tuple(bullet.dump() for bullet in self.bullets),
+                tuple(coord.toTuple() for coord in sorted(self.enemyLocations, key=Coord.index)))
+
+    def load(self, data):
+        """restores sprites made by dump into this engine, engine should be empty"""
+        walls, destroyedWalls, enemiesKilled, player, enemies, bullets, enemyLocations = data
+
+        for location, health in walls:
+            self.buildWall(Coord(location))
+            wall = self.walls[Coord(location)]
+            while wall.health > health:
+                wall.getHit()
+
+        self.destroyedWalls = [Coord(location) for location in destroyedWalls]
+        self.enemiesKilled = enemiesKilled
+
+        if player is not None:
+            movement, health, speed = player
+            self.spawnPlayer(Coord(movement[0]), health, speed)
+            self.getPlayer().loadMovement(movement)
+
+        for enemyData in enemies:
+            movement, health, maxHealth, speed = enemyData[:4]
+            enemy = self.spawnEnemy(Coord(movement[0]), maxHealth, speed)
+            enemy.load(enemyData)
+
+        for pos, direction, speed, center in bullets:
+            target = Coord(pos[0] + direction[0], pos[1] + direction[1], big=True)
+            bullet = self.spawnBullet(Coord(pos, big=True), target)
+            bullet.load(pos, direction, speed, center)
+
+        self.enemyLocations.clear()
+        self.enemyLocations.update(Coord(location) for location in enemyLocations)
+
     def buildWall(self, coord):
         """creates wall and adds it to wall dict with coord pos as key"""
         wall = Wall(coord)
         self.all.add(wall)
         self.walls[coord] = wall
+        self.occupancy.set(coord, True)
+        self.invalidator.wallChanged(coord, False)
         self.wallCount += 1
 
     def deleteWall(self, coord):
         """destroys and deletes wall and removes it from wall dict"""
         self.walls[coord].kill()
         del self.walls[coord]
+        self.occupancy.set(coord, False)
+        self.invalidator.wallChanged(coord, True)
         self.wallCount -= 1
 
     def spawnPlayer(self, coord, health, speed):
-        """spawns player and adds to groups"""
-        player = Player(coord, health, speed)
+        """spawns player and adds to groups, returns player"""
+        player = Player(coord, health, speed, self.controller)
         self.all.add(player)
         self.player.add(player)
+        return player
 
     def spawnEnemy(self, coord, health, speed):
-        """spawns enemy and adds to groups"""
-        enemy = Enemy(coord, health, speed)
+        """spawns enemy and adds to groups, returns enemy"""
+        enemy = self.enemyPool.acquire(coord, health, speed)
+        self.prevPositions.pop(enemy, None)
         self.all.add(enemy)
         self.enemies.add(enemy)
+        return enemy
 
     def spawnBullet(self, origin, target):
-        """spawns bullet and adds to groups"""
-        bullet = Bullet(origin, target)
+        """spawns bullet and adds to groups, returns bullet"""
+        bullet = self.bulletPool.acquire(origin, target)
+        self.prevPositions.pop(bullet, None)
         self.all.add(bullet)
         self.bullets.add(bullet)
+        return bullet
+
+
+class SpritePool:
+    """
+    keeps killed sprites of one kind so later spawns reuse their surfaces and rects instead of allocating new ones
+
+    Sprites made by a pool are handed back to it from their kill method, acquire calls reset on a recycled sprite with
+    the same arguments its constructor takes.
+    """
+
+    def __init__(self, make):
+        self.make = make  # builds new sprite when none are free
+        self.free = []
+        self.made = 0
+
+    def acquire(self, *args):
+        """returns recycled sprite reset with args, or new one if none are free"""
+        if len(self.free) > 0:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+        else:
+            sprite = self.make(*args)
+            sprite.pool = self
+            self.made += 1
+        sprite.pooled = False
+        return sprite
+
+    def release(self, sprite):
+        """takes back killed sprite, ignores sprites already released"""
+        if not sprite.pooled:
+            sprite.pooled = True
+            self.free.append(sprite)
+
+    def __len__(self):
+        return len(self.free)
+
+
+class EnemyStore:
+    """
+    structure of arrays holding enemy positions, targets, speeds, and health in NumPy arrays, one slot per enemy
+
+    Distances to player and movement towards target tiles are computed for all enemies in one vectorized
+    step per frame, Enemy sprites read their values from their slot and only copy positions into their rect for drawing.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = 0
+        self.enemies = []  # slot: enemy
+        self.free = []
+
+        self.pos = numpy.zeros((0, 2))  # pixels
+        self.location = numpy.zeros((0, 2))  # tiles
+        self.target = numpy.zeros((0, 2))  # tiles
+        self.velocity = numpy.zeros((0, 2))  # tiles per move, zero when not moving
+        self.speed = numpy.zeros(0)
+        self.decay = numpy.zeros(0)  # pixels per frame, speedDecay of speed
+        self.health = numpy.zeros(0)
+
+        self.distToPlayer = numpy.zeros(0)
+        self.changed = set()  # slots whose distance to player or fixed state changed since last takeChanged
+
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        """enlarges arrays to hold capacity enemies"""
+        extra = capacity - self.capacity
+
+        for name in ("pos", "location", "target", "velocity"):
+            setattr(self, name, numpy.concatenate((getattr(self, name), numpy.zeros((extra, 2)))))
+
+        for name in ("speed", "decay", "health", "distToPlayer"):
+            setattr(self, name, numpy.concatenate((getattr(self, name), numpy.zeros(extra))))
+
+        self.enemies.extend([None] * extra)
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def add(self, enemy, coord, health, speed):
+        """gives enemy a slot at coord, returns slot"""
+        if len(self.free) == 0:
+            self.grow(self.capacity * 2)
+
+        slot = self.free.pop()
+        self.enemies[slot] = enemy
+
+        big = coord.big()
+        self.pos[slot] = (big.x, big.y)
+        self.location[slot] = (coord.x, coord.y)
+        self.target[slot] = (coord.x, coord.y)
+        self.velocity[slot] = 0
+        self.health[slot] = health
+        self.setSpeed(slot, speed)
+
+        self.distToPlayer[slot] = 0
+
+        return slot
+
+    def remove(self, slot):
+        """frees slot"""
+        self.enemies[slot] = None
+        self.velocity[slot] = 0
+        self.free.append(slot)
+
+    def setSpeed(self, slot, speed):
+        """sets speed and caches pixels per frame it results in"""
+        self.speed[slot] = speed
+        self.decay[slot] = MovingSprite.speedDecay(speed)
+
+    def setTarget(self, slot, location, target):
+        """starts moving slot from tile location towards neighboring tile target"""
+        self.location[slot] = (location.x, location.y)
+        self.target[slot] = (target.x, target.y)
+        self.velocity[slot] = (target.x - location.x, target.y - location.y)
+        self.changed.add(slot)
+
+    def measure(self, player):
+        """distance from every enemy to player, slots whose distance changed are noted in changed"""
+        dist = numpy.hypot(self.location[:, 0] - player.x, self.location[:, 1] - player.y)
+        self.changed.update(numpy.flatnonzero(dist != self.distToPlayer).tolist())
+        self.distToPlayer[:] = dist
+
+    def takeChanged(self):
+        """enemies whose distance to player or fixed state changed since last call, in slot order"""
+        enemies = [self.enemies[slot] for slot in sorted(self.changed) if self.enemies[slot] is not None]
+        self.changed.clear()
+        return enemies
+
+    @staticmethod
+    def toRect(pos):
+        """pixel positions as rect coordinates, rounding half away from zero the same way pygame does"""
+        return numpy.copysign(numpy.floor(numpy.abs(pos) + 0.5), pos)
+
+    def move(self, dt):
+        """moves every moving enemy towards its target tile, enemies that reach their target are set down on it"""
+        moving = numpy.flatnonzero(numpy.any(self.velocity != 0, axis=1))
+        if len(moving) == 0:
+            return
+
+        velocity = self.velocity[moving]
+        goal = self.target[moving] * settings.gridSize
+        step = velocity * (self.decay[moving] * dt)[:, None]
+
+        # never overshoot target, measured from where sprite is drawn like MovingSprite.move
+        remaining = goal - self.toRect(self.pos[moving])
+        step = numpy.where((velocity != 0) & (numpy.abs(remaining) < numpy.abs(step)), remaining, step)
+
+        self.pos[moving] += step
+        rects = self.toRect(self.pos[moving])
+        arrived = numpy.all(rects == goal, axis=1)
+
+        for i, slot in enumerate(moving):
+            enemy = self.enemies[slot]
+            enemy.rect.x = rects[i, 0]
+            enemy.rect.y = rects[i, 1]
+
+            if arrived[i]:
+                self.velocity[slot] = 0
+                self.location[slot] = self.target[slot]
+                self.changed.add(slot)
+                enemy.arrive()
 
 
 class Sprite(pygame.sprite.Sprite):
@@ -155,8 +420,9 @@ class MovingSprite(Sprite):
 
     def move(self, dt):
         """allows sprites to move between tiles, speed dictates how many steps between tiles"""
-        dx = self.velocity[0] * self.speedDecay(self.speed) * dt
-        dy = self.velocity[1] * self.speedDecay(self.speed) * dt
+        step = self.speedDecay(self.speed) * dt
+        dx = self.velocity[0] * step
+        dy = self.velocity[1] * step
 
         if self.velocity[0] != 0 and abs(self.target.x * settings.gridSize[0] - self.rect.x) < abs(dx):
             dx = self.target.x * settings.gridSize[0] - self.rect.x
@@ -177,54 +443,69 @@ class MovingSprite(Sprite):
             self.prevLocation = self.location
             self.location = self.target
 
+    def dumpMovement(self):
+        """tile, pixel position, and movement state as primitive tuple"""
+        return (self.location.toTuple(),
+                None if self.target is None else self.target.toTuple(),
+                None if self.prevLocation is None else self.prevLocation.toTuple(),
+                (self.pos.x, self.pos.y), (self.rect.x, self.rect.y), tuple(self.velocity), self.fixed)
+
+    def loadMovement(self, data):
+        """restores state made by dumpMovement"""
+        location, target, prevLocation, pos, rect, velocity, fixed = data
+
+        self.location = Coord(location)
+        self.target = None if target is None else Coord(target)
+        self.prevLocation = None if prevLocation is None else Coord(prevLocation)
+
+        self.pos = Coord(pos, big=True)
+        self.rect.x, self.rect.y = rect
+
+        self.velocity = list(velocity)
+        self.fixed = fixed
+
 
 class Player(MovingSprite):
     """player that the user controls"""
 
-    def __init__(self, coord, health, speed):
+    def __init__(self, coord, health, speed, controller):
         MovingSprite.__init__(self, "player", coord, speed)
         self.image.fill(colors["blue"])
 
+        self.controller = controller
+
         self.maxHealth = 5
         self.health = health
 
     def update(self, dt, walls):
-        """takes in input from keyboard to determine movement"""
+        """takes in input from controller to determine movement"""
         if self.fixed:
             if self.target is not None:
                 self.location = self.target
 
-            if getKey("up"):
+            if self.controller.getKey("up"):
                 self.velocity[1] -= 1
 
-            if getKey("right"):
+            if self.controller.getKey("right"):
                 self.velocity[0] += 1
 
-            if getKey("down"):
+            if self.controller.getKey("down"):
                 self.velocity[1] += 1
 
-            if getKey("left"):
+            if self.controller.getKey("left"):
                 self.velocity[0] -= 1
 
             if self.velocity != [0, 0]:
-                # check that potential move is not in walls and is still in map
-                if self.location + self.velocity in walls or not settings.isInCellMap(self.location + self.velocity):
-                    if (self.location + [self.velocity[0], 0] in walls and
-                        self.location + [0, self.velocity[1]] in walls) or (not settings.isInCellMap(
-                            self.location + [self.velocity[0], 0]) and not settings.isInCellMap(
-                                self.location + [0, self.velocity[1]])):
-
-                        self.velocity = [0, 0]
-
-                    elif self.location + [self.velocity[0], 0] in walls or not settings.isInCellMap(
-                            self.location + [self.velocity[0], 0]):
-                        self.velocity = [0, self.velocity[1]]
+                # walls is occupancy grid, if move is blocked slide along whichever side is open
+                x, y = self.location.x, self.location.y
+                dx, dy = self.velocity
+
+                if not walls.legal(x, y, dx, dy):
+                    if dx != 0 and walls.legal(x, y, dx, 0):
+                        self.velocity = [dx, 0]
+                    elif dy != 0 and walls.legal(x, y, 0, dy):
+                        self.velocity = [0, dy]
                     else:
-                        self.velocity = [self.velocity[0], 0]
-
-                elif self.velocity[0] != 0 and self.velocity[1] != 0:
-                    if self.location + [self.velocity[0], 0] in walls and \
-                            self.location + [0, self.velocity[1]] in walls:
                         self.velocity = [0, 0]
 
             self.target = self.location + self.velocity
@@ -235,12 +516,38 @@ class Player(MovingSprite):
 
 
 class Enemy(MovingSprite):
-    """enemy sprite, searches for and follows player, attempting to collide"""
-    pathMap = CoordMap()
-    locations = set()
+    """enemy sprite, searches for and follows player, attempting to collide, state is kept in a slot of EnemyStore"""
+
+    def __init__(self, coord, health, speed, engine):
+        # shared with other enemies of same SpriteEngine
+        self.store = engine.enemyStore
+        self.pathMap = engine.pathMap
+        self.invalidator = engine.invalidator
+        self.locations = engine.enemyLocations
+
+        self.slot = self.store.add(self, coord, health, speed)
+
+        self.pool = None
+        self.pooled = False
 
-    def __init__(self, coord, health, speed):
         MovingSprite.__init__(self, "enemy", coord, speed)
+        self.reset(coord, health, speed)
+
+    def reset(self, coord, health, speed):
+        """puts enemy in its starting state at coord, used when spawning and when reused from pool"""
+        if self.slot is None:
+            self.slot = self.store.add(self, coord, health, speed)
+
+        self.location = coord
+        self.pos = coord.big()
+        self.rect.x = self.pos.x
+        self.rect.y = self.pos.y
+
+        self.speed = speed
+        self.velocity = [0, 0]
+        self.prevLocation = None
+        self.target = None
+        self.fixed = True
 
         self.originalColor = [0, 255, 25]
         self.color = self.originalColor
@@ -253,45 +560,146 @@ class Enemy(MovingSprite):
         # necessary for searching:
         self.path = None
         self.queued = False
-        self.distToPlayer = None
-        self.pathError = 0
+        self.holding = 0  # frames left to wait in place, set by repeated points of cooperative paths
+
+        self.locations.add(self.location)
+
+        self.invalidator.mark(self)  # needs its first path
+
+    @property
+    def health(self):
+        return self.store.health[self.slot]
+
+    @health.setter
+    def health(self, health):
+        self.store.health[self.slot] = health
+
+    @property
+    def speed(self):
+        return self.store.speed[self.slot]
 
-        Enemy.locations.add(self.location)
+    @speed.setter
+    def speed(self, speed):
+        self.store.setSpeed(self.slot, speed)
+
+    @property
+    def distToPlayer(self):
+        return self.store.distToPlayer[self.slot]
 
     def update(self, dt, walls):
-        """sets new tile to move to if enemy is currently fixed on tile"""
+        """sets new tile to move to if enemy is currently fixed on tile, moving itself is done by EnemyStore. A point
+        of a cooperative path that repeats the one before it is a wait, enemy holds still for as long as crossing a tile
+        takes it"""
         if self.fixed:
-            if self.path is not None and len(self.path) > 0:
+            if self.holding > 0:
+                self.holding -= dt
+
+            if self.holding <= 0 and self.path is not None and len(self.path) > 0:
                 self.target = self.path.get()
-                Enemy.locations.add(self.target)
 
-                if self.location in Enemy.locations:
-                    Enemy.locations.remove(self.location)
+                # smoothed paths only mark their waypoints
+                if not isinstance(self.path, WaypointPath) or self.path.reached:
+                    self.pathMap.remove(self.target)
 
-                Enemy.pathMap[self.target] = False
-                self.velocity = [self.target.x - self.location.x, self.target.y - self.location.y]
+                if self.target == self.location:
+                    if self.path.waits:
+                        # one step of a cooperative plan spent waiting for another enemy to pass
+                        self.holding = settings.gridSize[0] / self.store.decay[self.slot]
+                    return
 
-        if self.velocity != [0, 0]:
-            self.fixed = False
-            self.move(dt)
+                self.locations.add(self.target)
+
+                if self.location in self.locations:
+                    self.locations.remove(self.location)
+
+                self.fixed = False
+                self.store.setTarget(self.slot, self.location, self.target)
+
+    def arrive(self):
+        """called by EnemyStore once enemy reaches its target"""
+        self.fixed = True
+
+        self.prevLocation = self.location
+        self.location = self.target
+
+        if self.path is None or len(self.path) == 0:
+            self.invalidator.mark(self)
 
     def destroy(self):
         """deletes enemy and removes path from enemy map"""
-        if self.target in Enemy.locations:
-            Enemy.locations.remove(self.target)
+        if self.target in self.locations:
+            self.locations.remove(self.target)
         if self.path is not None:
-            for pt in self.path:
-                if pt in Enemy.pathMap:
-                    Enemy.pathMap[pt] = False
+            self.pathMap.removePath(self.path)
+            self.path = None
+        self.invalidator.untrack(self)
         self.kill()
 
-    def shouldSearch(self):
-        """determines whether enemy should get a new path"""
-        if self.fixed and \
-                ((self.path is None or len(self.path) == 0) or self.pathError > 10):
-            return True
-        else:
-            return False
+    def kill(self):
+        """removes enemy from all groups, frees its slot in store, and returns it to its pool, values read from store
+        are invalid afterwards"""
+        if self.slot is not None:
+            self.store.remove(self.slot)
+            self.slot = None
+        pygame.sprite.Sprite.kill(self)
+        if self.pool is not None:
+            self.pool.release(self)
+
+    def dumpMovement(self):
+        """movement state as MovingSprite saves it, but with pixel position kept by EnemyStore, which moves enemy"""
+        movement = MovingSprite.dumpMovement(self)
+        return movement[:3] + (tuple(float(value) for value in self.store.pos[self.slot]),) + movement[4:]
+
+    def dump(self):
+        """movement, health, speed, color, remaining path, and distances to player as primitive tuple, smoothed paths
+        keep their waypoints and how many cells were consumed"""
+        path = None
+        if isinstance(self.path, WaypointPath):
+            consumed = WaypointPath(self.path.waypoints).length - self.path.length
+            path = (tuple(pt.toTuple() for pt in self.path.waypoints), self.path.failed, self.path.trapped, False,
+                    consumed)
+        elif self.path is not None:
+            path = (tuple(pt.toTuple() for pt in self.path), self.path.failed, self.path.trapped,
+                    self.path.waits, None)
+
+        return (self.dumpMovement(), float(self.health), self.maxHealth, float(self.speed), tuple(self.color), path,
+                self.queued, self.holding, float(self.distToPlayer))
+
+    def load(self, data):
+        """restores state made by dump onto enemy spawned with same max health"""
+        movement, health, maxHealth, speed, color, path, queued, holding, distToPlayer = data
+
+        self.loadMovement(movement)
+        self.store.pos[self.slot] = movement[3]
+        if not self.fixed:
+            self.store.setTarget(self.slot, self.location, self.target)
+
+        self.health = health
+        self.speed = speed
+
+        self.color[:] = color
+        self.image.fill(colors["red"] if health == 1 and maxHealth > 1 else self.color)
+
+        if path is not None:
+            points, failed, trapped, waits, consumed = path
+            if consumed is not None:
+                self.path = WaypointPath([Coord(pt) for pt in points])
+                for _ in range(consumed):
+                    self.path.get()
+            else:
+                self.path = Path([Coord(pt) for pt in points]) if len(points) > 0 else Path()
+            self.path.failed = failed
+            self.path.trapped = trapped
+            self.path.waits = waits
+
+            self.pathMap.addPath(self.path)
+            self.invalidator.track(self, self.path)
+
+        self.queued = queued
+        self.holding = holding
+
+        # measured at start of last update, before enemies moved, so it can not be measured again
+        self.store.distToPlayer[self.slot] = distToPlayer
 
     def getHit(self):
         """handles what happens when enemy is hit"""
@@ -317,17 +725,17 @@ class Enemy(MovingSprite):
         self.target = None
 
         if self.path is not None:
-            for pt in self.path:
-                Enemy.pathMap[pt] = False
+            self.pathMap.removePath(self.path)
 
         self.path = path
         if len(self.path) > 0:
             self.path.get()
 
         self.queued = False
+        self.holding = 0
 
-        for pt in path:
-            Enemy.pathMap[pt] = True
+        self.pathMap.addPath(path)
+        self.invalidator.track(self, path)
 
     def __lt__(self, other):
         """defined if stored in priority queue and primary cost results in tie"""
@@ -338,32 +746,51 @@ class Enemy(MovingSprite):
 
 
 class Bullet(pygame.sprite.Sprite):
-    """bullet that player can shoot"""
+    """bullet that player can shoot, every bullet draws the same shared image"""
+    sharedImage = None
 
     def __init__(self, origin, target):
         pygame.sprite.Sprite.__init__(self)
 
         self.name = "bullet"
 
-        self.image = Surface(settings.gridSize)
+        if Bullet.sharedImage is None:
+            Bullet.sharedImage = Bullet.makeImage()
+
+        self.image = Bullet.sharedImage
         self.rect = Rect((0, 0), (int(settings.gridSize[0]/2), int(settings.gridSize[1]/2)))
 
-        self.image.fill(colors["white"])
-        self.image.set_colorkey(colors["white"])
+        self.pool = None
+        self.pooled = False
+
+        self.pos = Coord(0, 0, big=True)
+        self.prevPos = Coord(0, 0, big=True)  # where bullet was before last update, traced for wall hits
+        self.reset(origin, target)
+
+    @staticmethod
+    def makeImage():
+        """orange circle on a transparent background"""
+        image = Surface(settings.gridSize)
+
+        image.fill(colors["white"])
+        image.set_colorkey(colors["white"])
 
         width = int(settings.gridSize[0] / 2)
         height = int(settings.gridSize[0] / 2)
         radius = int(settings.gridSize[0] / 2)
 
-        pygame.draw.circle(self.image, colors["orange"], (width, height), radius)
+        pygame.draw.circle(image, colors["orange"], (width, height), radius)
+        return image
 
+    def reset(self, origin, target):
+        """aims bullet from origin towards target, used when shooting and when reused from pool"""
         rawDirection = [target.x - origin.x, target.y - origin.y]
         magnitude = math.sqrt(rawDirection[0] ** 2 + rawDirection[1] ** 2)
         self.direction = [rawDirection[0] / magnitude, rawDirection[1] / magnitude]
 
-        self.pos = origin
-        self.pos.x += self.direction[0] * 10
-        self.pos.y += self.direction[1] * 10
+        self.pos.x = origin.x + self.direction[0] * 10
+        self.pos.y = origin.y + self.direction[1] * 10
+        self.prevPos.x, self.prevPos.y = self.pos.x, self.pos.y
 
         self.rect.x = self.pos.x
         self.rect.y = self.pos.y
@@ -375,16 +802,19 @@ class Bullet(pygame.sprite.Sprite):
         dx = self.direction[0] * self.speed * dt
         dy = self.direction[1] * self.speed * dt
 
-        # normalize movement so bullet never skips more than one cell
-        if abs(dx) > settings.gridSize[0] and abs(dx) > abs(dy):
-            temp = settings.gridSize[0] * int((dx / abs(dx)))
-            dy = dy * temp / dx
-            dx = temp
+        self.prevPos.x, self.prevPos.y = self.pos.x, self.pos.y
 
-        elif abs(dy) > settings.gridSize[1]:
-            temp = settings.gridSize[1] * int((dy / abs(dy)))
-            dx = dx * temp / dy
-            dy = temp
+        # normalize movement so bullet never skips more than one cell, not needed when its path is traced
+        if not settings.continuousBullets:
+            if abs(dx) > settings.gridSize[0] and abs(dx) > abs(dy):
+                temp = settings.gridSize[0] * int((dx / abs(dx)))
+                dy = dy * temp / dx
+                dx = temp
+
+            elif abs(dy) > settings.gridSize[1]:
+                temp = settings.gridSize[1] * int((dy / abs(dy)))
+                dx = dx * temp / dy
+                dy = temp
 
         self.pos.x += dx
         self.pos.y += dy
@@ -397,6 +827,24 @@ class Bullet(pygame.sprite.Sprite):
     def destroy(self):
         self.kill()
 
+    def dump(self):
+        """position, direction, and speed as primitive tuple"""
+        return (self.pos.x, self.pos.y), tuple(self.direction), self.speed, self.rect.center
+
+    def load(self, pos, direction, speed, center):
+        """restores state made by dump"""
+        self.pos.x, self.pos.y = pos
+        self.prevPos.x, self.prevPos.y = pos
+        self.direction = list(direction)
+        self.speed = speed
+        self.rect.center = center
+
+    def kill(self):
+        """removes bullet from all groups and returns it to its pool"""
+        pygame.sprite.Sprite.kill(self)
+        if self.pool is not None:
+            self.pool.release(self)
+
 
 class Wall(Sprite):
     """wall that prevents movement"""
@@ -3,7 +3,8 @@ Author: Grant Holmes
 Contact: g.holmes429@gmail.com
 Date: 08/16/2020
 
-Manages game logic and game event handling. Has full control over sprites and all other action.
+Manages game logic and game event handling. Has full control over sprites and all other action. A running game can be
+saved as a compressed binary snapshot and restored later, e.g. to start benchmarks at late waves.
 
 Classes:
     GameState
@@ -11,22 +12,33 @@ Classes:
 """
 
 from core import sprites
-from data.peripherals import getMouse
-from core.board import Map, Coord
+from data.peripherals import Controller
+from core.board import Map, Coord, SegmentedPath, ReservationTable, SearchLog
 from data import settings
 
-from time import time
-from queue import PriorityQueue
-from random import randint, choice
+import random
+import pickle
+import zlib
+from itertools import chain
 
 
 class GameState:
     """Manages game logic"""
-
-    def __init__(self):
-        # main components
-        self.map = Map()
-        self.sprites = sprites.SpriteEngine()
+    snapshotVersion = 10
+
+    # attributes saved in snapshots as is, everything else is rebuilt from sprites and map
+    snapshotFields = ("prevEvent", "currEvent", "wallsLeft", "trapped", "trappedCounter", "trappedDelay", "searches",
+                      "searchesPerFrame", "searchAbort", "batchSearch", "batchSize", "cooperative", "smoothPaths",
+                      "farSearch", "farEpsilon", "playerNode", "playerHealth", "playerSpeed", "bulletCoolDown",
+                      "bulletCounter", "score", "waveNum", "simTime", "timer", "delay", "enemiesPerWave",
+                      "increasePerWave", "enemySpeed", "enemyHealth", "deviation", "maxEnemySpeed", "maxEnemyHealth")
+
+    def __init__(self, controller=None, rand=None):
+        # main components, input comes from keyboard and mouse unless another controller is given
+        self.controller = controller if controller is not None else Controller()
+        self.random = rand if rand is not None else random  # games given their own Random can run side by side
+        self.sprites = sprites.SpriteEngine(self.controller)
+        self.map = Map(self.random, self.sprites.occupancy)
 
         # event management -> eventName: {event: functionObject, requires dt: bool}
         self.events = {
@@ -52,6 +64,31 @@ class GameState:
         self.trapped = False
         self.trappedCounter = 0
         self.trappedDelay = 60
+        self.searches = 0  # paths given to enemies
+        self.searchLog = SearchLog()  # stats of every enemy search by wave, not saved in snapshots
+        self.playerNode = None  # node player was in last update as tuple, paths are invalidated when it changes
+        self.smoothPaths = True  # far paths are collapsed into straight lines between waypoints
+
+        # cells close and weighted A* searches may reach before giving up, so a target that can not be reached costs
+        # at most this much rather than a flood of map, no path on testing.benchmark layouts needs more
+        self.searchAbort = 1000
+
+        # far enemies search gate to gate with HPA*, or with weighted A* ("WA*") for paths at most farEpsilon times
+        # longer than shortest path. Weighted A* only expands fewer cells than plain A* on scattered walls and more on
+        # mazes and fortresses (see testing.benchmark compareWeighted), its gain is the bound, so HPA* stays default
+        self.farSearch = "HPA*"
+        self.farEpsilon = 1.5
+
+        # batched searching, one backwards search from player answers up to batchSize enemies. Breadth first search
+        # can not steer around other enemies' paths, so only far enemies searching with weighted A* are batched, close
+        # enemies and HPA* searches keep steering around pathMap or reservations and still search one at a time
+        self.batchSearch = False
+        self.batchSize = 8
+
+        # cooperative searching, close enemies plan around where other enemies will be for the next few steps, off as
+        # it does not lower how often enemies replan in bot games
+        self.cooperative = False
+        self.reservations = ReservationTable(8)
 
         # player modifiers
         self.playerHealth = 10
@@ -64,7 +101,8 @@ class GameState:
 
         # wave modifiers
         self.waveNum = 1
-        self.timer = time()
+        self.simTime = 0  # seconds simulated, advances with dt so countdowns follow fast forward
+        self.timer = self.simTime
         self.delay = 3
 
         # enemy modifiers
@@ -79,6 +117,7 @@ class GameState:
 
     def runEvent(self, dt):
         """executes current event and updates/ moves sprites"""
+        self.simTime += dt / settings.normalizedFrameRate
 
         if self.events[self.currEvent]["isTimeDependent"]:
             self.events[self.currEvent]["run"](dt)
@@ -126,7 +165,7 @@ class GameState:
                 return "wait"
 
         if self.prevEvent == "wait":
-            if time() - self.timer >= self.delay:
+            if self.simTime - self.timer >= self.delay:
                 # waiting for countdown, countdown is complete -> spawn wave
                 return "spawnWave"
             else:
@@ -137,6 +176,55 @@ class GameState:
             # game is over -> continue displaying endgame until player exits game
             return "gameOver"
 
+    def snapshot(self):
+        """
+        saves game as compressed bytes, GameState.restore makes a game that continues from this point
+
+        Walls with their health, map abstraction, player, enemies with their remaining paths, bullets, random state,
+        wave modifiers, and order enemies are queued, marked, and reserved in are saved as primitive tuples, so a
+        restored game plays out exactly as this one would given the same input.
+        """
+        indexOf = {enemy: i for i, enemy in enumerate(self.sprites.enemies)}  # enemies in order sprites dump them
+        data = (self.snapshotVersion,
+                tuple(getattr(self, name) for name in self.snapshotFields),
+                self.random.getstate(),
+                self.sprites.dump(),
+                None if self.map.walls is None else self.map.dump(),
+                (self.toSearch.dump(indexOf), self.sprites.invalidator.dump(indexOf),
+                 self.reservations.dump(indexOf)))
+        return zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def restore(snapshot, controller=None, rand=None):
+        """
+        makes game from bytes saved by snapshot
+
+        Parameters:
+            snapshot -> bytes returned by snapshot
+            controller -> input for restored game, keyboard and mouse if None
+            rand -> random source of restored game, random module if None, either way it continues from saved state
+        """
+        version, *data = pickle.loads(zlib.decompress(snapshot))
+        if version != GameState.snapshotVersion:
+            raise ValueError("Snapshot version " + str(version) + " not supported...")
+        fields, randomState, spriteData, mapData, (queue, invalidator, reservations) = data
+
+        game = GameState(controller, rand)
+        for name, value in zip(GameState.snapshotFields, fields):
+            setattr(game, name, value)
+        game.random.setstate(randomState)
+
+        game.sprites.load(spriteData)
+        if mapData is not None:
+            game.map.load(game.sprites.walls.keys(), mapData)
+
+        enemies = list(game.sprites.enemies)
+        game.toSearch.load(queue, enemies)
+        game.sprites.invalidator.load(invalidator, enemies)
+        game.reservations.load(reservations, enemies)
+
+        return game
+
     def getSprites(self):
         """allows access to all sprites"""
         return self.sprites.all
@@ -165,7 +253,7 @@ class GameState:
             # wave num, score, hp, countdown
             health = int(self.sprites.getPlayer().health * 100 / self.sprites.getPlayer().maxHealth)
             return [" Wave: " + str(self.waveNum) + " ", " Score: " + str(self.score) + " ", None,
-                    " HP: " + str(health) + " ", " Prepare: " + str(self.delay - int(time() - self.timer)) + " "]
+                    " HP: " + str(health) + " ", " Prepare: " + str(self.delay - int(self.simTime - self.timer)) + " "]
 
         else:
             return [None]
@@ -173,18 +261,28 @@ class GameState:
     def updateSprites(self, dt):
         """checks for and handles collisions, then updates movements"""
         self.sprites.checkCollisions()
+        for enemy in self.sprites.killedEnemies:
+            self.toSearch.remove(enemy)
+            self.reservations.release(enemy)
+
         self.sprites.update(dt)
         self.score = self.sprites.enemiesKilled
 
+        # keep priority of queued enemies current, only enemies that moved or saw player move have new keys
+        for enemy in self.sprites.enemyStore.takeChanged():
+            if enemy in self.toSearch:
+                self.toSearch.updateEnemy(enemy.distToPlayer, enemy)
+
     def spawnPlayer(self):
         """spawns player in middle of board, users instance variable speed as parameter"""
         pos = Coord(int(settings.numCells[0] / 2), int(settings.numCells[1] / 2))
         self.sprites.spawnPlayer(pos, self.playerHealth, self.playerSpeed)
 
     def buildWalls(self):
-        """gets mouse position and allows player to dynamically build walls if placement valid"""
+        """gets mouse position and allows player to dynamically build walls if placement valid, map precomputes paths in
+        spare time"""
         if self.wallsLeft > 0:
-            mouse = getMouse()
+            mouse = self.controller.getMouse()
             smallPos = Coord(mouse["mousePosition"], big=True).small()
 
             if mouse["leftClick"] and smallPos not in self.map.edges and \
@@ -193,21 +291,27 @@ class GameState:
 
                 if smallPos not in self.sprites.walls:
                     self.sprites.buildWall(smallPos)
+                    self.map.wallChanged(smallPos, True)
                     self.wallsLeft -= 1
 
             elif mouse["rightClick"]:
                 if smallPos in self.sprites.walls:
                     self.sprites.deleteWall(smallPos)
+                    self.map.wallChanged(smallPos, False)
                     self.wallsLeft += 1
 
+        # spare time while player builds goes to searching paths map will need once generated
+        self.map.precompute(self.sprites.walls.keys(), settings.buildPrecomputeSearches,
+                            settings.buildPrecomputeBudget)
+
     def generateMap(self):
         """passes walls to map, generates gates and abstraction levels for HPA* pathfinding"""
         self.map.generate(self.sprites.walls.keys())
 
     def wait(self):
         """counts down before starting wave and spawning enemies"""
-        if (time() - self.timer >= self.delay and self.prevEvent == "update") or self.prevEvent == "generate":
-            self.timer = time()
+        if (self.simTime - self.timer >= self.delay and self.prevEvent == "update") or self.prevEvent == "generate":
+            self.timer = self.simTime
 
     def spawnWave(self):
         """spawns enemies on edge of map, randomly modifies parameters within constraints, updates modifiers"""
@@ -219,23 +323,23 @@ class GameState:
             speed = self.enemySpeed
             health = self.enemyHealth
 
-            randomDev = randint(-self.deviation[0], self.deviation[1])
+            randomDev = self.random.randint(-self.deviation[0], self.deviation[1])
             speed += randomDev/2
 
-            randomDev = randint(-self.deviation[0], self.deviation[1])
+            randomDev = self.random.randint(-self.deviation[0], self.deviation[1])
             health += randomDev
 
-            start = choice(edges)
+            start = self.random.choice(edges)
             edges.remove(start)
 
             self.sprites.spawnEnemy(start, health, speed)
 
         # increases difficulty for next wave
 
-        numNewEnemies = randint(self.increasePerWave[0], self.increasePerWave[1])
+        numNewEnemies = self.random.randint(self.increasePerWave[0], self.increasePerWave[1])
 
-        ds = randint(0, 10) / 20
-        healthIncrease = randint(0, 1)
+        ds = self.random.randint(0, 10) / 20
+        healthIncrease = self.random.randint(0, 1)
 
         if self.enemiesPerWave + numNewEnemies < len(self.map.edges):
             self.enemiesPerWave += numNewEnemies
@@ -251,11 +355,19 @@ class GameState:
     def update(self, dt):
         """updates map w/ current walls, shoots bullets, manages conditional pathfinding"""
 
-        if len(self.sprites.destroyedWalls) > 0:
+        invalidator = self.sprites.invalidator
+
+        # every wall destroyed since last update, several can go down in one collision check
+        while len(self.sprites.destroyedWalls) > 0:
             wall = self.sprites.destroyedWalls.pop(0)
             self.map.update(wall)
 
-        mouseState = getMouse()
+        playerNode = self.sprites.getPlayer().location.getNode().toTuple()
+        if playerNode != self.playerNode:
+            self.playerNode = playerNode
+            invalidator.playerMoved(Coord(playerNode))
+
+        mouseState = self.controller.getMouse()
         if mouseState["leftClick"] and int(self.bulletCounter) <= 0:
             self.shoot(mouseState["mousePosition"])
             self.bulletCounter = self.bulletCoolDown
@@ -263,8 +375,12 @@ class GameState:
         elif self.bulletCounter > 0:
             self.bulletCounter -= 1*dt
 
-        for enemy in self.sprites.enemies:
-            if self.shouldSearch(enemy):
+        if self.cooperative:  # reservations are only read by cooperative searches
+            self.reservations.advance(dt / self.stepLength())
+
+        # only enemies whose paths events made stale are queued
+        for enemy in invalidator.take():
+            if enemy.alive() and not enemy.queued:
                 enemy.queued = True
 
                 # add to priority queue with distance from player as priority
@@ -272,27 +388,21 @@ class GameState:
 
         self.updateTrapped(dt)
 
-        if not self.trapped:
+        if not self.trapped and self.batchSearch:
+            self.setBatchPaths()
+
+        elif not self.trapped:
             for i in range(self.searchesPerFrame):
                 if not self.toSearch.empty():
                     enemy = self.toSearch.getEnemy()
 
-                    if enemy.fixed:
-                        # if enemy is in close proximity with player
-                        if enemy.distToPlayer <= 7.5:
-                            self.setClosePath(enemy)
-
+                    if enemy.fixed and enemy.alive():
+                        # if enemy is walled off from player no search can succeed, try again once walls change
+                        if not self.isReachable(enemy):
+                            enemy.queued = False
+                            invalidator.waitForWalls(enemy)
                         else:
-                            # if enemy is on gate
-                            if enemy.location in self.map.gateCoords:
-                                self.setGatedPath(enemy)
-
-                            # else if enemy is not on gate
-                            else:
-                                self.setOffroadPath(enemy)
-
-                        if self.trapped:
-                            self.trappedCounter = self.trappedDelay
+                            self.searchPath(enemy)
 
     def shoot(self, pos):
         """player tries to shoot bullet towards mouse"""
@@ -304,49 +414,119 @@ class GameState:
 
         self.sprites.spawnBullet(playerPos, target)
 
-    def shouldSearch(self, enemy):
-        """enemy should search if it is queued and (path is empty or path is now inaccurate) or is on gate"""
-        if not enemy.queued and enemy.shouldSearch() and \
-                (enemy.location in self.map.gateCoords or enemy.path is None or len(enemy.path) == 0):
-            return True
-        else:
-            return False
+    def stepLength(self):
+        """approximate number of frames an enemy of average speed takes to cross one tile"""
+        return settings.gridSize[0] / sprites.MovingSprite.speedDecay(self.enemySpeed)
 
     def updateTrapped(self, dt):
         """manages how often enemies should try to pathfind when player is inaccessible to improve performance"""
         if self.trapped:
             if int(self.trappedCounter) <= 0:
-                playerPos = self.sprites.getPlayer().location
-                numEnemies = len(self.sprites.enemies)
-                randEnemyPos = self.sprites.enemies.sprites()[randint(0, numEnemies-1)].location
-
-                # enemies are no longer trapped if path can be found from player to random enemy
-                if not self.map.search(playerPos, randEnemyPos, "A*").failed:
+                # enemies are no longer trapped once any of them is in same connected region as player
+                if any(self.isReachable(enemy) for enemy in self.sprites.enemies):
                     self.trapped = False
                 else:
                     self.trappedCounter = self.trappedDelay
             else:
                 self.trappedCounter -= 1 * dt
 
-    def setClosePath(self, enemy):
-        """sets enemy's path when enemy is close to player, use A* for improved accuracy"""
-        path = self.map.search(enemy.location, self.sprites.getPlayer().location, "A*",
-                               sprites.Enemy.pathMap)
+    def isReachable(self, enemy):
+        """True if a path exists between enemy and player, checked through map's region labels without searching"""
+        return self.map.connectivity.connected(enemy.location, self.sprites.getPlayer().location)
+
+    def setPath(self, enemy, path):
+        """gives path to enemy, reserves its next few steps if enemies search cooperatively, and flags if player is
+        inaccessible"""
         enemy.setPath(path)
+        self.searches += 1
+        if self.cooperative:
+            self.reservations.reserve(enemy, chain([enemy.location], enemy.path))
         if path.trapped:
             self.trapped = True
 
+    def recordSearch(self, path):
+        """adds stats of search that made path to log of current wave"""
+        if path.stats is not None:
+            self.searchLog.add(self.waveNum, path.stats)
+
+    def searchPath(self, enemy):
+        """sets path of reachable enemy with search suited to its distance from player"""
+        # if enemy is in close proximity with player
+        if enemy.distToPlayer <= 7.5:
+            self.setClosePath(enemy)
+
+        elif self.farSearch == "WA*":
+            self.setWeightedPath(enemy)
+
+        else:
+            # if enemy is on gate
+            if enemy.location in self.map.gateCoords:
+                self.setGatedPath(enemy)
+
+            # else if enemy is not on gate
+            else:
+                self.setOffroadPath(enemy)
+
+        if self.trapped:
+            self.trappedCounter = self.trappedDelay
+
+    def canBatch(self, enemy):
+        """True if enemy's own search would not steer around other enemies, so a batched search can stand in for it"""
+        return enemy.distToPlayer > 7.5 and self.farSearch == "WA*"
+
+    def setBatchPaths(self):
+        """
+        sets paths for up to batchSize queued enemies at once using a single backwards search from player
+
+        Only enemies canBatch allows join the batch. Queued enemies whose searches steer around other enemies' paths
+        are searched one at a time as usual, at most searchesPerFrame of them each frame.
+        """
+        enemies = []
+        searches = 0
+        while len(enemies) < self.batchSize and searches < self.searchesPerFrame and not self.toSearch.empty():
+            enemy = self.toSearch.getEnemy()
+            if enemy.fixed and enemy.alive():
+                if not self.isReachable(enemy):
+                    enemy.queued = False
+                    self.sprites.invalidator.waitForWalls(enemy)
+                elif self.canBatch(enemy):
+                    enemies.append(enemy)
+                else:
+                    self.searchPath(enemy)
+                    searches += 1
+
+        if len(enemies) > 0:
+            paths = self.map.searchMany(self.sprites.getPlayer().location, [enemy.location for enemy in enemies])
+            self.recordSearch(paths[0])  # one search made every path
+            for enemy, path in zip(enemies, paths):
+                self.setPath(enemy, path)
+
+            if self.trapped:
+                self.trappedCounter = self.trappedDelay
+
+    def setClosePath(self, enemy):
+        """sets enemy's path when enemy is close to player, use A* for improved accuracy"""
+        if self.cooperative:
+            path = self.map.cooperativeSearch(enemy.location, self.sprites.getPlayer().location, self.reservations,
+                                              enemy, abort=self.searchAbort)
+        else:
+            path = self.map.search(enemy.location, self.sprites.getPlayer().location, "A*",
+                                   self.sprites.pathMap, abort=self.searchAbort)
+        self.recordSearch(path)
+        self.setPath(enemy, path)
+
     def setGatedPath(self, enemy):
         """sets enemy's path when enemy is far from player and on gate, uses HPA* for improved performance"""
         targetGate = self.map.getRandomGate(self.sprites.getPlayer().location)
         playerGates = self.map.getGates(self.sprites.getPlayer().location)
-        enemyPaths = sprites.Enemy.pathMap
+        enemyPaths = self.sprites.pathMap
 
         if targetGate is not None:
             path = self.map.search(enemy.location, targetGate, "HPA*", paths=enemyPaths, altTargets=playerGates)
-            enemy.setPath(path)
-            if path.trapped:
-                self.trapped = True
+            self.recordSearch(path)
+            if self.smoothPaths:
+                path = self.map.smooth(path)
+            self.setPath(enemy, path)
 
     def setOffroadPath(self, enemy):
         """sets enemy's path when enemy is far from player and not on gate, used A* to get to gate then HPA*"""
@@ -356,17 +536,30 @@ class GameState:
         targetGate = self.map.getRandomGate(self.sprites.getPlayer().location)
         playerGates = self.map.getGates(self.sprites.getPlayer().location)
 
-        enemyPaths = sprites.Enemy.pathMap
+        enemyPaths = self.sprites.pathMap
 
         if targetGate is not None and homeGate is not None:
             path = self.map.search(enemy.location, homeGate, "A*", altTargets=enemyGates)
+            self.recordSearch(path)
             if not path.failed:
                 path2 = self.map.search(path.end, targetGate, "HPA*", paths=enemyPaths, altTargets=playerGates)
+                self.recordSearch(path2)
+                if len(path2) > 0 and path2.peek() == path.end:  # home gate ends first leg, it is not a wait
+                    path2.get()
+                path = SegmentedPath(path)
                 path.extend(path2)
-            enemy.setPath(path)
-
-            if path.trapped:
-                self.trapped = True
+                if self.smoothPaths:
+                    path = self.map.smooth(path)
+            self.setPath(enemy, path)
+
+    def setWeightedPath(self, enemy):
+        """sets enemy's path when enemy is far from player using weighted A*, path is within farEpsilon of shortest"""
+        path = self.map.search(enemy.location, self.sprites.getPlayer().location, "A*", abort=self.searchAbort,
+                               epsilon=self.farEpsilon)
+        self.recordSearch(path)
+        if self.smoothPaths:
+            path = self.map.smooth(path)
+        self.setPath(enemy, path)
 
     def gameOver(self):
         """player is dead, removes all sprites except for walls"""
@@ -375,36 +568,137 @@ class GameState:
                 sprite.kill()
 
 
-class EnemySearchQueue(PriorityQueue):
-    """extension of priority queue to handle managing enemies and when they pathfind"""
+class EnemySearchQueue:
+    """
+    indexed binary heap of enemies waiting to search, keyed by enemy so priorities can be inserted, updated, and
+    removed in O(log n). Queued enemies that are not fixed on a tile are held in a separate waiting set and enter heap
+    once they are ready, so getEnemy only ever returns enemies that can search.
+    """
 
     def __init__(self):
-        PriorityQueue.__init__(self)
-        self.tieBreakers = set()
+        self.heap = []  # [priority, order, enemy]
+        self.positions = {}  # enemy: index in heap
+        self.waiting = {}  # enemy: priority
+        self.order = 0  # tiebreaker so enemies with same priority come out first in first out
+
+    def putEnemy(self, priority, enemy):
+        """puts enemy in queue with priority, updates priority instead if enemy is already queued"""
+        if enemy in self:
+            self.updateEnemy(priority, enemy)
+        elif enemy.fixed:
+            self.push(priority, enemy)
+        else:
+            self.waiting[enemy] = priority
+
+    def updateEnemy(self, priority, enemy):
+        """changes priority of queued enemy, moves it between heap and waiting set if it became ready or unready"""
+        if enemy in self.positions:
+            if not enemy.fixed:
+                self.remove(enemy)
+                self.waiting[enemy] = priority
+            else:
+                i = self.positions[enemy]
+                previous = self.heap[i][0]
+                self.heap[i][0] = priority
+                if priority < previous:
+                    self.siftUp(i)
+                else:
+                    self.siftDown(i)
+
+        elif enemy in self.waiting:
+            if enemy.fixed:
+                del self.waiting[enemy]
+                self.push(priority, enemy)
+            else:
+                self.waiting[enemy] = priority
 
     def getEnemy(self):
-        """pops from queue until finding enemy that is fixed, re-adding enemies that weren't ready"""
-        reFeed = []
-        item = self.get()
-        enemy = item[2]
-        self.tieBreakers.remove(item[1])
-        while not enemy.fixed:
-            reFeed.append(item)
-            if not self.empty():
-                item = self.get()
-                enemy = item[2]
-                self.tieBreakers.remove(item[1])
+        """removes and returns ready enemy with lowest priority"""
+        enemy = self.heap[0][2]
+        self.remove(enemy)
+        return enemy
+
+    def remove(self, enemy):
+        """removes enemy from queue if it is queued"""
+        if enemy in self.waiting:
+            del self.waiting[enemy]
+
+        elif enemy in self.positions:
+            i = self.positions.pop(enemy)
+            last = self.heap.pop()
+            if i < len(self.heap):
+                self.heap[i] = last
+                self.positions[last[2]] = i
+                self.siftUp(i)
+                self.siftDown(self.positions[last[2]])
+
+    def push(self, priority, enemy):
+        """adds enemy to heap"""
+        self.order += 1
+        self.heap.append([priority, self.order, enemy])
+        self.positions[enemy] = len(self.heap) - 1
+        self.siftUp(len(self.heap) - 1)
+
+    def swap(self, i, j):
+        """swaps heap entries and keeps positions up to date"""
+        self.heap[i], self.heap[j] = self.heap[j], self.heap[i]
+        self.positions[self.heap[i][2]] = i
+        self.positions[self.heap[j][2]] = j
+
+    def siftUp(self, i):
+        """moves entry up until parent is smaller"""
+        while i > 0:
+            parent = (i - 1) // 2
+            if self.heap[i][:2] < self.heap[parent][:2]:
+                self.swap(i, parent)
+                i = parent
             else:
                 break
-        while len(reFeed) != 0:
-            entry = reFeed.pop(0)
-            self.putEnemy(entry[0], entry[2])
-        return enemy
 
-    def putEnemy(self, priority, enemy):
-        """puts enemy in queue with priority, adds tiebreaker to ensure entries are unique and won't throw exceptions"""
-        tieBreaker = 0
-        while tieBreaker in self.tieBreakers:
-            tieBreaker += 1
-        self.put((priority, tieBreaker, enemy))
-        self.tieBreakers.add(tieBreaker)
+    def siftDown(self, i):
+        """moves entry down until children are larger"""
+        size = len(self.heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and self.heap[child][:2] < self.heap[smallest][:2]:
+                    smallest = child
+            if smallest == i:
+                break
+            self.swap(i, smallest)
+            i = smallest
+
+    def dump(self, indexOf):
+        """
+        queued enemies as primitive tuples, enemies are saved as their index from indexOf and ones not in it are dead
+        and left out
+
+        Heap entries are saved sorted, a sorted list is a valid heap and as priority and order together are unique
+        enemies come out of it in the same order as from heap they were saved from.
+        """
+        return (tuple(sorted((float(priority), order, indexOf[enemy]) for priority, order, enemy in self.heap
+                             if enemy in indexOf)),
+                tuple((indexOf[enemy], float(priority)) for enemy, priority in self.waiting.items()
+                      if enemy in indexOf),
+                self.order)
+
+    def load(self, data, enemies):
+        """replaces queue with one made by dump, enemies is list of enemies dump gave indices into"""
+        heap, waiting, self.order = data
+        self.heap = [[priority, order, enemies[i]] for priority, order, i in heap]
+        self.positions = {entry[2]: i for i, entry in enumerate(self.heap)}
+        self.waiting = {enemies[i]: priority for i, priority in waiting}
+
+    def empty(self):
+        """True if no enemy is ready to search"""
+        return len(self.heap) == 0
+
+    def enemies(self):
+        """list of every queued enemy, ready or not"""
+        return [entry[2] for entry in self.heap] + list(self.waiting)
+
+    def __contains__(self, enemy):
+        return enemy in self.positions or enemy in self.waiting
+
+    def __len__(self):
+        return len(self.heap) + len(self.waiting)
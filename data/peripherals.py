@@ -4,6 +4,9 @@ Contact: g.holmes429@gmail.com
 Date: 08/16/2020
 
 Allows access to keyboard, mouse, and any other peripherals
+
+Classes:
+    Controller
 """
 
 import pygame
@@ -45,3 +48,13 @@ def getKey(key):
 
 def getMouse():
     return {"leftClick": getLeftClick(), "rightClick": getRightClick(), "mousePosition": getMousePos()}
+
+
+class Controller:
+    """player input read from keyboard and mouse, games can be given any object with same methods instead, e.g. a bot"""
+
+    def getKey(self, key):
+        return getKey(key)
+
+    def getMouse(self):
+        return getMouse()
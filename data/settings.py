@@ -14,6 +14,7 @@ numNodes = (8, 8)
 cellsInNode = (5, 5)
 
 numCells = (numNodes[0] * cellsInNode[0] + 1, numNodes[1] * cellsInNode[1] + 1)
+
 gridSize = (int(mapSize[0] / numCells[0]), int(mapSize[0] / numCells[0]))
 
 gameName = "AI Attack!"
@@ -21,6 +22,15 @@ gameName = "AI Attack!"
 targetFrameRate = 60
 normalizedFrameRate = 60
 
+simTickRate = 60  # fixed simulation ticks per second, rendering is decoupled from this
+maxTicksPerFrame = 5  # ticks run to catch up after a slow frame, any further time owed is dropped
+
+continuousBullets = True  # bullets trace their movement through wall grid instead of rect tests, can move any distance
+maxSightLength = 10  # longest straight line in cells between waypoints of smoothed paths
+buildPrecomputeSearches = 24  # gate paths searched per tick while player builds walls
+buildPrecomputeBudget = 0.006  # seconds per tick spent on gate table while player builds walls
+numLandmarks = 0  # landmarks for ALT heuristic, only kept while walls stay fixed so only testing.benchmark sets it
+
 
 def isInCellMap(coord):
     """returns true if coord is in bounds of map dictated by settings"""
@@ -19,18 +19,23 @@ class Game:
     """
     Main driver for this game. Creates necessary game windows in __init__. Handles flow of updating and running events.
     """
-    engine = GameEngine()
-    game = GameState()
 
     def __init__(self):
+        self.engine = GameEngine()
+        self.game = GameState()
+
         self.engine.makeBackground(settings.mapSize, colors["lightBlue"], makeGrid=True, color2=colors["white"])
         self.engine.makeWindow(settings.sidePanel, (settings.mapSize[0], 0), colors["purple"])
 
     def run(self):
-        """Drives game"""
+        """Drives game, runs fixed sim ticks then draws sprites interpolated between last two ticks"""
         while self.engine.keepRunning():
-            self.engine.clearScreen()
+            for _ in self.engine.ticks():
+                self.game.sprites.savePositions()
+                self.game.runEvent(self.engine.dt)
 
-            self.game.runEvent(self.engine.dt)
+            self.engine.clearScreen()
 
+            self.game.sprites.interpolate(self.engine.alpha())
             self.engine.updateScreen(self.game.getSprites(), self.game.getText())
+            self.game.sprites.restorePositions()
@@ -0,0 +1,320 @@
+"""
+Allocation profiling, plays a headless bot game with tracemalloc running and reports memory allocated each frame, split
+by subsystem, along with live counts of the small objects hot paths make most of, then checks a few scenarios against
+allocation budgets
+
+Run from the project root with: python -m testing.allocation [--frames N] [--seed N] [--top N] [--budgets]
+
+Classes:
+    AllocationTracker
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from core.board import Map, Coord, Reference, Path
+from core.sprites import SpriteEngine
+from core.engine import GameEngine
+from data import settings
+from data.assets import colors
+from testing.batch import BotGame
+from testing.benchmark import scatteredLayout, fortressLayout, samplePairs
+from testing.snapshot import lateWave, restoreWithBot
+
+from collections import Counter
+from functools import wraps
+import tracemalloc
+import argparse
+import sys
+import gc
+
+# methods whose allocations count towards each subsystem
+subsystems = {
+    "map build": [(Map, "generate"), (Map, "precompute")],
+    "search": [(Map, "search"), (Map, "searchMany"), (Map, "smooth")],
+    "sprite update": [(SpriteEngine, "update"), (SpriteEngine, "checkCollisions")],
+    "render": [(SpriteEngine, "interpolate"), (GameEngine, "clearScreen"), (GameEngine, "updateScreen")],
+}
+
+# classes counted live, subclasses count towards their base
+liveClasses = (Coord, Reference, Path)
+
+# limits for checkBudgets, bytes are peak bytes allocated above what was allocated when scenario started
+budgets = {
+    "search peak bytes": 100000,  # worst single search on scattered walls
+    "search retained blocks": 50,  # left allocated after 100 searches whose paths were dropped
+    "generate peak bytes": 4000000,  # generating map around fortress
+    "late wave tick peak bytes": 200000,  # worst tick of 200 enemies in wave 30
+    "late wave retained coords": 1500,  # growth in live Coords over 300 ticks of that wave
+}
+
+
+class AllocationTracker:
+    """
+    Wraps subsystem methods to measure allocations of each call. Blocks and bytes are net of what was freed and are
+    exclusive, so a search made while the map is built counts towards search only, peak is highest bytes allocated
+    above start of call and includes calls made inside it. Anything allocated in a frame outside of subsystems counts
+    as other
+    """
+
+    def __init__(self, subsystems=subsystems):
+        self.subsystems = subsystems
+        self.originals = []
+        self.stack = []
+
+        self.stats = {name: {"calls": 0, "blocks": 0, "bytes": 0, "peak": 0} for name in list(subsystems) + ["other"]}
+        self.frames = []  # (blocks, bytes, peak) of each frame
+
+    def install(self):
+        """wraps every subsystem method, starts tracemalloc if not already tracing"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        for name, methods in self.subsystems.items():
+            for cls, method in methods:
+                original = getattr(cls, method)
+                self.originals.append((cls, method, original))
+                setattr(cls, method, self.wrap(name, original))
+
+    def uninstall(self):
+        """puts original methods back and stops tracemalloc"""
+        for cls, method, original in reversed(self.originals):
+            setattr(cls, method, original)
+        self.originals.clear()
+        tracemalloc.stop()
+
+    def wrap(self, name, func):
+        tracker = self
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            tracker.enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                tracker.exit()
+
+        return wrapper
+
+    def enter(self, name):
+        """starts measuring call of subsystem name"""
+        current, peak = tracemalloc.get_traced_memory()
+        if len(self.stack) > 0:
+            # peak is about to be reset, keep what caller has reached so far
+            self.stack[-1][3] = max(self.stack[-1][3], peak)
+        tracemalloc.reset_peak()
+
+        # name, blocks at start, bytes at start, peak, blocks of calls inside, bytes of calls inside
+        self.stack.append([name, sys.getallocatedblocks(), current, current, 0, 0])
+
+    def exit(self):
+        """ends innermost measured call, returns its inclusive net blocks, net bytes and peak bytes"""
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks()
+
+        name, startBlocks, startBytes, callPeak, innerBlocks, innerBytes = self.stack.pop()
+        callPeak = max(callPeak, peak)
+        usage = (blocks - startBlocks, current - startBytes, callPeak - startBytes)
+
+        stats = self.stats[name]
+        stats["calls"] += 1
+        stats["blocks"] += usage[0] - innerBlocks
+        stats["bytes"] += usage[1] - innerBytes
+        stats["peak"] = max(stats["peak"], usage[2])
+
+        if len(self.stack) > 0:
+            caller = self.stack[-1]
+            caller[3] = max(caller[3], callPeak)
+            caller[4] += usage[0]
+            caller[5] += usage[1]
+
+        return usage
+
+    def frame(self, func, *args):
+        """runs func as one frame, anything it allocates outside of subsystems counts as other"""
+        self.enter("other")
+        try:
+            func(*args)
+        finally:
+            self.frames.append(self.exit())
+
+    def report(self):
+        """lines of table of allocations per subsystem and per frame"""
+        lines = ["subsystem          calls   blocks/call   KB/call   peak KB"]
+        for name, stats in self.stats.items():
+            calls = max(stats["calls"], 1)
+            lines.append("%-15s %8d %13.1f %9.2f %9.1f" % (name, stats["calls"], stats["blocks"] / calls,
+                                                           stats["bytes"] / calls / 1024, stats["peak"] / 1024))
+
+        if len(self.frames) > 0:
+            blocks = [frame[0] for frame in self.frames]
+            peaks = [frame[2] for frame in self.frames]
+            lines.append("%d frames, blocks per frame mean %.1f max %d, peak KB mean %.1f max %.1f" %
+                         (len(self.frames), sum(blocks) / len(blocks), max(blocks), sum(peaks) / len(peaks) / 1024,
+                          max(peaks) / 1024))
+        return lines
+
+
+def liveCounts(classes=liveClasses):
+    """number of live objects of each class, counted from objects tracked by garbage collector"""
+    counts = Counter()
+    for obj in gc.get_objects():
+        for cls in classes:
+            if isinstance(obj, cls):
+                counts[cls.__name__] += 1
+    return counts
+
+
+def topLines(before, after, count=10):
+    """lines of project source that allocated most between two tracemalloc snapshots, leaving out this profiler"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    filters = [tracemalloc.Filter(True, os.path.join(root, "*")), tracemalloc.Filter(False, __file__)]
+    differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    return [str(difference) for difference in differences[:count]]
+
+
+def profileGame(frames=2000, seed=0, countEvery=250, top=0, render=True):
+    """
+    plays bot game for a number of frames with allocations tracked, drawing each frame like Game.run does
+
+    Parameters:
+        frames -> frames played, one sim tick each
+        seed -> seed for bot and game
+        countEvery -> live objects are counted every this many frames, counting walks every tracked object
+        top -> if more than 0, prints this many source lines that allocated most over whole game
+        render -> draws frames to a dummy display so render is measured
+    """
+    tracker = AllocationTracker()
+    tracker.install()
+
+    engine = None
+    if render:
+        engine = GameEngine()
+        engine.makeBackground(settings.mapSize, colors["lightBlue"], makeGrid=True, color2=colors["white"])
+        engine.makeWindow(settings.sidePanel, (settings.mapSize[0], 0), colors["purple"])
+
+    run = BotGame(seed, frames)
+    game = run.game
+
+    def frame():
+        game.sprites.savePositions()
+        run.step()
+        if engine is not None:
+            engine.clearScreen()
+            game.sprites.interpolate(1)
+            engine.updateScreen(game.getSprites(), game.getText())
+        game.sprites.restorePositions()
+
+    start = tracemalloc.take_snapshot() if top > 0 else None
+
+    try:
+        while not run.finished():
+            tracker.frame(frame)
+            if len(tracker.frames) % countEvery == 0:
+                counts = liveCounts()
+                print("frame %5d wave %2d %-8s %s" % (len(tracker.frames), game.waveNum, game.currEvent,
+                                                      "  ".join("%s %d" % item for item in sorted(counts.items()))))
+
+        for line in tracker.report():
+            print(line)
+
+        if start is not None:
+            print("most allocating lines:")
+            for line in topLines(start, tracemalloc.take_snapshot(), top):
+                print("    " + line)
+
+    finally:
+        tracker.uninstall()
+
+    return tracker
+
+
+def measure(func, *args):
+    """runs func with tracemalloc on, returns its result, net blocks and peak bytes above start"""
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    current = tracemalloc.get_traced_memory()[0]
+    blocks = sys.getallocatedblocks()
+    try:
+        result = func(*args)
+        gc.collect()
+        return result, sys.getallocatedblocks() - blocks, tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+
+
+def searchScenario(numPairs=100):
+    """peak bytes of worst search and blocks left after dropping every path, on scattered walls"""
+    walls = scatteredLayout()
+    gameMap = Map()
+    gameMap.generate(walls)
+    pairs = samplePairs(walls, numPairs)
+
+    worst = 0
+    for source, target in pairs:
+        worst = max(worst, measure(gameMap.search, source, target, "A*")[2])
+
+    def searchAll():
+        for source, target in pairs:
+            gameMap.search(source, target, "A*")
+
+    searchAll()  # warm up caches kept by map so only what searches keep is counted
+    return {"search peak bytes": worst, "search retained blocks": measure(searchAll)[1]}
+
+
+def generateScenario():
+    """peak bytes of generating map around fortress"""
+    return {"generate peak bytes": measure(Map().generate, fortressLayout())[2]}
+
+
+def lateWaveScenario(ticks=300):
+    """peak bytes of worst tick and growth in live Coords over ticks of a wave 30 snapshot"""
+    game = restoreWithBot(lateWave().snapshot())
+    dt = settings.normalizedFrameRate / settings.simTickRate
+
+    before = liveCounts()["Coord"]
+    worst = 0
+    for _ in range(ticks):
+        if game.currEvent == "gameOver":
+            break
+        worst = max(worst, measure(game.runEvent, dt)[2])
+    gc.collect()
+
+    return {"late wave tick peak bytes": worst, "late wave retained coords": liveCounts()["Coord"] - before}
+
+
+def checkBudgets():
+    """runs every scenario, prints each measurement against its budget, returns names of budgets exceeded"""
+    measured = {}
+    for scenario in (searchScenario, generateScenario, lateWaveScenario):
+        measured.update(scenario())
+
+    exceeded = []
+    for name, limit in budgets.items():
+        ok = measured[name] <= limit
+        print("%-28s %10d / %-10d %s" % (name, measured[name], limit, "ok" if ok else "OVER"))
+        if not ok:
+            exceeded.append(name)
+    return exceeded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="profiles allocations of a headless bot game")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=250, help="frames between live object counts")
+    parser.add_argument("--top", type=int, default=10, help="source lines that allocated most to print")
+    parser.add_argument("--noRender", action="store_true", help="skip drawing frames")
+    parser.add_argument("--budgets", action="store_true", help="check allocation budgets instead of profiling a game")
+    args = parser.parse_args()
+
+    if args.budgets:
+        sys.exit(1 if len(checkBudgets()) > 0 else 0)
+
+    profileGame(args.frames, args.seed, args.count, args.top, not args.noRender)
+
+
+if __name__ == "__main__":
+    main()
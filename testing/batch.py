@@ -0,0 +1,213 @@
+"""
+Runs many headless games with a scripted bot across a process pool and writes per-game metrics to one results file
+
+Run from the project root with: python -m testing.batch [--games N] [--processes N] [--ticks N] [--perTask N]
+[--out FILE]
+
+Classes:
+    Bot
+    BotGame
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from core.state import GameState
+from core.board import Coord
+from data import settings
+
+from multiprocessing import Pool
+from time import perf_counter
+import argparse
+import random
+import csv
+
+
+class Bot:
+    """
+    scripted player given to GameState as its controller, places walls in a broken ring around itself with a few
+    scattered walls, then stands still and shoots at the closest enemy
+    """
+
+    def __init__(self, seed):
+        self.rand = random.Random(seed)
+        self.game = None
+        self.plan = None
+
+    def makePlan(self):
+        """cells to try building walls on in order, invalid cells are skipped by the game"""
+        center = self.game.sprites.getPlayer().location
+        radius = self.rand.randint(4, 9)
+
+        ring = [center + (dx, dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)
+                if max(abs(dx), abs(dy)) == radius]
+        ring = [cell for cell in ring if self.rand.random() < 0.8]
+
+        scattered = [Coord(self.rand.randint(1, settings.numCells[0] - 2),
+                           self.rand.randint(1, settings.numCells[1] - 2)) for _ in range(2 * self.game.wallsLeft)]
+
+        return iter(ring + scattered)
+
+    def twin(self):
+        """bot in same state as this one, plays a game restored from a snapshot of this bot's game the same way"""
+        twin = Bot(0)
+        twin.rand.setstate(self.rand.getstate())
+        if self.plan is not None:
+            rest = list(self.plan)
+            self.plan, twin.plan = iter(rest), iter(rest)
+        return twin
+
+    @staticmethod
+    def toPixels(coord):
+        """pixel position of center of cell"""
+        return (coord.x * settings.gridSize[0] + int(settings.gridSize[0] / 2),
+                coord.y * settings.gridSize[1] + int(settings.gridSize[1] / 2))
+
+    def getKey(self, key):
+        return False
+
+    def getMouse(self):
+        """clicks next planned wall while building, then aims at closest enemy"""
+        if self.game.currEvent == "build":
+            if self.plan is None:
+                self.plan = self.makePlan()
+            cell = next(self.plan, None)
+            if cell is None:
+                # ran out of plan, finish build phase
+                self.game.wallsLeft = 0
+                return {"leftClick": False, "rightClick": False, "mousePosition": (0, 0)}
+            return {"leftClick": True, "rightClick": False, "mousePosition": self.toPixels(cell)}
+
+        enemies = self.game.sprites.enemies
+        if len(enemies) == 0:
+            return {"leftClick": False, "rightClick": False, "mousePosition": (0, 0)}
+
+        closest = min(enemies, key=lambda enemy: enemy.distToPlayer)
+        return {"leftClick": True, "rightClick": False, "mousePosition": closest.rect.center}
+
+
+class BotGame:
+    """one headless game played by a Bot with its own random source, stepped a tick at a time so many games can run
+    side by side in one process"""
+
+    def __init__(self, seed, maxTicks=20000):
+        self.seed = seed
+        self.maxTicks = maxTicks
+
+        self.bot = Bot(seed)
+        self.game = GameState(self.bot, random.Random(seed))
+        self.bot.game = self.game
+
+        self.dt = settings.normalizedFrameRate / settings.simTickRate
+
+        self.ticks = 0
+        self.updateTicks = 0
+        self.updateSeconds = 0
+        self.maxTickSeconds = 0
+        self.generateSeconds = 0
+        self.trappedTicks = 0
+
+    def finished(self):
+        """game is over or was cut off"""
+        return self.game.currEvent == "gameOver" or self.ticks >= self.maxTicks
+
+    def step(self):
+        """runs one sim tick and times it"""
+        event = self.game.currEvent
+
+        start = perf_counter()
+        self.game.runEvent(self.dt)
+        seconds = perf_counter() - start
+
+        if event == "update":
+            self.updateTicks += 1
+            self.updateSeconds += seconds
+            self.maxTickSeconds = max(self.maxTickSeconds, seconds)
+            if self.game.trapped:
+                self.trappedTicks += 1
+
+        elif event == "generate":
+            self.generateSeconds = seconds
+
+        self.ticks += 1
+
+    def metrics(self):
+        """dict of metrics for results file"""
+        waves = self.game.waveNum
+        searchStats = self.game.searchLog.summary()
+        return {
+            "seed": self.seed,
+            "wave": waves,
+            "score": self.game.score,
+            "ticks": self.ticks,
+            "gameOver": self.game.currEvent == "gameOver",
+            "walls": len(self.game.sprites.walls),
+            "generateMs": round(self.generateSeconds * 1000, 3),
+            "meanTickMs": round(self.updateSeconds * 1000 / max(self.updateTicks, 1), 4),
+            "maxTickMs": round(self.maxTickSeconds * 1000, 3),
+            "searches": self.game.searches,
+            "searchesPerWave": round(self.game.searches / waves, 2),
+            "searchMs": searchStats["totalMs"],
+            "meanSearchMs": searchStats["meanMs"],
+            "maxSearchMs": searchStats["maxMs"],
+            "meanExpanded": searchStats["meanExpanded"],
+            "abortedSearches": searchStats["outcomes"].get("aborted", 0),
+            "exhaustedSearches": searchStats["outcomes"].get("exhausted", 0),
+            "trappedTicks": self.trappedTicks,
+            "trappedFraction": round(self.trappedTicks / max(self.updateTicks, 1), 4),
+        }
+
+
+def runGames(seeds, maxTicks=20000):
+    """plays one game per seed in this process, stepping every unfinished game once per round, returns metrics"""
+    games = [BotGame(seed, maxTicks) for seed in seeds]
+
+    playing = games
+    while len(playing) > 0:
+        for game in playing:
+            game.step()
+        playing = [game for game in playing if not game.finished()]
+
+    return [game.metrics() for game in games]
+
+
+def runBatch(numGames, processes=None, maxTicks=20000, seed=0, gamesPerTask=1):
+    """plays numGames games across a process pool, each task steps gamesPerTask games side by side, returns list of
+    metrics in seed order"""
+    seeds = list(range(seed, seed + numGames))
+    tasks = [(seeds[i:i + gamesPerTask], maxTicks) for i in range(0, numGames, gamesPerTask)]
+
+    with Pool(processes) as pool:
+        return [metrics for results in pool.starmap(runGames, tasks) for metrics in results]
+
+
+def writeResults(results, path):
+    """writes one row of metrics per game as csv"""
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0].keys()))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="runs headless bot games in parallel and records metrics")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=None, help="defaults to number of cpus")
+    parser.add_argument("--ticks", type=int, default=20000, help="sim ticks before a game is cut off")
+    parser.add_argument("--perTask", type=int, default=1, help="games stepped side by side in each worker task")
+    parser.add_argument("--seed", type=int, default=0, help="seed of first game, each game after adds one")
+    parser.add_argument("--out", default="batch_results.csv")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    results = runBatch(args.games, args.processes, args.ticks, args.seed, args.perTask)
+    writeResults(results, args.out)
+
+    waves = [result["wave"] for result in results]
+    print("%d games in %.1f s, mean wave %.2f, max wave %d, results in %s" %
+          (len(results), perf_counter() - start, sum(waves) / len(waves), max(waves), args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmarks for pathfinding on a few fixed wall layouts, runs without a display
+
+Run from the project root with: python -m testing.benchmark
+"""
+
+from core.board import Map, Coord
+from data import settings
+
+from random import Random
+from time import perf_counter
+
+
+def openLayout():
+    """no walls at all"""
+    return set()
+
+
+def scatteredLayout(seed=0):
+    """100 walls placed at random, roughly what a new player builds"""
+    rand = Random(seed)
+    walls = set()
+    center = Coord(int(settings.numCells[0] / 2), int(settings.numCells[1] / 2))
+    while len(walls) < 100:
+        wall = Coord(rand.randint(1, settings.numCells[0] - 2), rand.randint(1, settings.numCells[1] - 2))
+        if wall != center:
+            walls.add(wall)
+    return walls
+
+
+def mazeLayout():
+    """long vertical walls with gaps alternating between top and bottom, forces long winding paths"""
+    walls = set()
+    for i, x in enumerate(range(4, settings.numCells[0] - 4, 4)):
+        for y in range(1, settings.numCells[1] - 1):
+            if (i % 2 == 0 and y < settings.numCells[1] - 4) or (i % 2 == 1 and y > 3):
+                walls.add(Coord(x, y))
+    return walls
+
+
+def fortressLayout():
+    """ring of walls around center of map with a single opening on the far side, a common player strategy"""
+    walls = set()
+    center = Coord(int(settings.numCells[0] / 2), int(settings.numCells[1] / 2))
+    radius = 6
+    for dx in range(-radius, radius + 1):
+        for dy in range(-radius, radius + 1):
+            if max(abs(dx), abs(dy)) == radius and not (dx == radius and dy == 0):
+                walls.add(center + (dx, dy))
+    return walls
+
+
+layouts = {
+    "open": openLayout,
+    "scattered": scatteredLayout,
+    "maze": mazeLayout,
+    "fortress": fortressLayout
+}
+
+
+def makeMap(walls, numLandmarks):
+    """generates map over walls using given number of landmarks"""
+    previous = settings.numLandmarks
+    settings.numLandmarks = numLandmarks
+    try:
+        gameMap = Map()
+        gameMap.generate(walls)
+    finally:
+        settings.numLandmarks = previous
+    return gameMap
+
+
+def samplePairs(walls, numPairs, seed=0):
+    """random start and target pairs, neither covered by walls"""
+    rand = Random(seed)
+    free = [Coord(x, y) for x in range(settings.numCells[0]) for y in range(settings.numCells[1])
+            if Coord(x, y) not in walls]
+    return [(rand.choice(free), rand.choice(free)) for _ in range(numPairs)]
+
+
+def runSearches(gameMap, pairs, searchType="A*", **kwargs):
+    """runs search for every pair, returns total cells expanded and seconds spent"""
+    expanded = 0
+    start = perf_counter()
+    for source, target in pairs:
+        expanded += gameMap.search(source, target, searchType, **kwargs).stats.expanded
+    return expanded, perf_counter() - start
+
+
+def compareHeuristics(numPairs=200, seed=0, numLandmarks=4):
+    """expansions and time of A* with plain distance estimates against ALT landmark heuristic on every layout, ALT is
+    off by default so it is measured with numLandmarks landmarks"""
+    print("layout      plain exp    ALT exp   reduction   plain s   ALT s")
+    for name, layout in layouts.items():
+        walls = layout()
+        pairs = samplePairs(walls, numPairs, seed)
+
+        plain = runSearches(makeMap(walls, 0), pairs)
+        alt = runSearches(makeMap(walls, numLandmarks), pairs)
+
+        reduction = 100 * (1 - alt[0] / plain[0]) if plain[0] > 0 else 0
+        print("%-10s %10d %10d %10.1f%% %9.3f %7.3f" % (name, plain[0], alt[0], reduction, plain[1], alt[1]))
+
+
+def compareWeighted(numPairs=200, seed=0, epsilons=(1, 1.25, 1.5, 2, 3)):
+    """
+    expansions of weighted A* at each epsilon against plain A* as the game runs it, and worst ratio of path length to
+    shortest path, which should never be more than epsilon
+
+    Plain A* steers with a straighter Manhattan estimate that is not admissible, so it gives no bound on its paths but
+    is the search far enemies would otherwise use, weighted A* is only worth it where it expands fewer cells than that.
+    Epsilon of 1 is weighted A* with an admissible estimate, its paths are shortest and ratios are measured against it.
+    """
+    print("layout     epsilon   expanded   worst ratio   seconds")
+    for name, layout in layouts.items():
+        walls = layout()
+        pairs = samplePairs(walls, numPairs, seed)
+        gameMap = makeMap(walls, settings.numLandmarks)
+
+        rows = []
+        for epsilon in (None,) + tuple(epsilons):
+            expanded = 0
+            lengths = []
+            start = perf_counter()
+            for source, target in pairs:
+                path = gameMap.search(source, target, "A*", epsilon=epsilon)
+                expanded += path.stats.expanded
+                lengths.append(None if path.failed else len(path) - 1)
+            rows.append((epsilon, expanded, lengths, perf_counter() - start))
+
+        shortest = rows[1][2]
+        for epsilon, expanded, lengths, seconds in rows:
+            ratios = [length / best for length, best in zip(lengths, shortest) if length is not None and best]
+            print("%-10s %7s %10d %13.3f %9.3f" % (name, "plain" if epsilon is None else "%.2f" % epsilon, expanded,
+                                                   max(ratios, default=1), seconds))
+
+
+if __name__ == "__main__":
+    compareHeuristics()
+    compareWeighted()
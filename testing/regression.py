@@ -0,0 +1,310 @@
+"""
+Regression checks for bugs found in review, each check plays out the situation that went wrong and returns a list of
+problems found, empty if check passed
+
+Run from the project root with: python -m testing.regression
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from core.board import Connectivity, GateTable, Map, Path
+from core.state import GameState
+from data import settings
+from testing.batch import BotGame
+
+import random
+import sys
+
+
+def generatedGame(seed=0):
+    """bot game with walls built and map generated, waiting for first wave"""
+    run = BotGame(seed)
+    while run.game.currEvent != "wait":
+        run.step()
+    return run.game
+
+
+def sameRegions(connectivity, fresh):
+    """problems where region labels kept up to date by connectivity split free cells differently than fresh labels"""
+    problems = []
+    pairs = {}  # root label in connectivity: label in fresh
+    reverse = {}  # label in fresh: root label in connectivity
+
+    for index in range(len(fresh.labels)):
+        label, freshLabel = connectivity.labels[index], fresh.labels[index]
+        if (label == Connectivity.blocked) != (freshLabel == Connectivity.blocked):
+            problems.append("cell %d labeled %d, fresh labels give %d" % (index, label, freshLabel))
+        elif label != Connectivity.blocked:
+            root = connectivity.find(label)
+            if pairs.setdefault(root, freshLabel) != freshLabel or reverse.setdefault(freshLabel, root) != root:
+                problems.append("cell %d is in a region fresh labels split or merge" % index)
+
+    return problems
+
+
+def checkDestroyedWalls(seed=0, count=2):
+    """destroys several walls in one tick, region labels have to match labels made from scratch"""
+    game = generatedGame(seed)
+    dt = settings.normalizedFrameRate / settings.simTickRate
+
+    walls = list(game.sprites.walls.values())[:count]
+    for wall in walls:
+        while wall.health > 0:
+            game.sprites.hitWall(wall)
+
+    game.update(dt)
+
+    problems = sameRegions(game.map.connectivity, Connectivity(game.map))
+    if len(game.sprites.destroyedWalls) > 0:
+        problems.append("%d destroyed walls left unprocessed" % len(game.sprites.destroyedWalls))
+    return problems
+
+
+def checkWallEvents(seed=0, count=2):
+    """destroys several walls in one tick, stand-ins for enemies whose paths cross each wall and for an enemy waiting
+    for walls have to be marked"""
+    game = generatedGame(seed)
+    invalidator = game.sprites.invalidator
+
+    walls = list(game.sprites.walls.values())[:count]
+    crossing = [object() for _ in walls]
+    for standIn, wall in zip(crossing, walls):
+        invalidator.track(standIn, Path([wall.location]))
+    waiting = object()
+    invalidator.waitForWalls(waiting)
+
+    for wall in walls:
+        while wall.health > 0:
+            game.sprites.hitWall(wall)
+
+    marked = invalidator.take()
+    problems = ["enemy crossing wall %d was not marked" % i for i, standIn in enumerate(crossing)
+                if standIn not in marked]
+    if waiting not in marked:
+        problems.append("enemy waiting for walls was not marked")
+
+    for standIn in crossing + [waiting]:
+        invalidator.untrack(standIn)
+    return problems
+
+
+def checkDeadNotMarked(seed=0):
+    """enemy marked for a new path that dies before marks are taken must not be returned by take"""
+    game = generatedGame(seed)
+    invalidator = game.sprites.invalidator
+    standIn = object()
+    invalidator.mark(standIn)
+    invalidator.untrack(standIn)  # what dying enemies do
+    if standIn in invalidator.take():
+        return ["enemy that died after being marked was returned by take"]
+    return []
+
+
+def sameAbstraction(gameMap):
+    """problems where HPA* graph or gate table kept up to date by map differ from ones made from scratch"""
+    problems = []
+    graph = gameMap.graphs["HPA*"]
+    graph.pack()
+
+    edges = {}
+    for gate in gameMap.gates:
+        cell = gate.get()
+        edges[cell.index] = gameMap.gateEdges(cell)
+        row = sorted(graph.neighbors(cell.index))
+        if row != edges[cell.index]:
+            problems.append("gate %s has edges %s, paths give %s" % (cell.location, row, edges[cell.index]))
+
+    fresh = GateTable()
+    fresh.update({(index, neighbor): weight for index, row in edges.items() for neighbor, weight in row}, edges)
+    table = gameMap.gateTable
+    for a in edges:
+        for b in edges:
+            if table.distance(a, b) != fresh.distance(a, b):
+                problems.append("gate table distance %d -> %d is %s, fresh table gives %s" %
+                                (a, b, table.distance(a, b), fresh.distance(a, b)))
+            elif table.route(a, b) != fresh.route(a, b):
+                problems.append("gate table route %d -> %d is %s, fresh table gives %s" %
+                                (a, b, table.route(a, b), fresh.route(a, b)))
+    return problems
+
+
+def checkAbstractGraph(seed=0, count=20):
+    """destroys walls one tick at a time, patched HPA* graph and gate table have to match ones made from scratch"""
+    game = generatedGame(seed)
+    dt = settings.normalizedFrameRate / settings.simTickRate
+
+    for wall in list(game.sprites.walls.values())[:count]:
+        while wall.health > 0:
+            game.sprites.hitWall(wall)
+        game.update(dt)
+
+    return sameAbstraction(game.map)
+
+
+def checkBuildPhase(seed=0, removeEvery=8):
+    """
+    builds walls with a few taken down again along the way, gates, combos, and gate neighbors kept up to date while
+    building have to match a map generated from scratch over the same walls, and every gate path has to go around
+    walls; paths themselves can differ as searches are not exact
+    """
+    run = BotGame(seed)
+    game = run.game
+    rand = random.Random(seed)
+    ticks = 0
+    while game.currEvent != "generate":
+        run.step()
+        ticks += 1
+        if game.currEvent == "build" and ticks % removeEvery == 0 and len(game.sprites.walls) > 0:
+            coord = rand.choice(sorted(game.sprites.walls, key=lambda wall: wall.index()))
+            game.sprites.deleteWall(coord)
+            game.map.wallChanged(coord, False)
+            game.wallsLeft += 1
+    run.step()
+
+    built = game.map
+    fresh = Map()
+    fresh.generate(set(game.sprites.walls))
+
+    problems = sameRegions(built.connectivity, Connectivity(built))
+    for location in built.gateCoords ^ fresh.gateCoords:
+        problems.append("gate %s is only in one of built and fresh map" % location)
+    for node in built.nodes:
+        if node.combos != fresh.nodes(node.location).combos:
+            problems.append("node %s has different combos than fresh map" % node.location)
+    for cell in built.cellList:
+        neighbors = {gate.get().location for gate in cell.neighbors["allHPA*"]}
+        if neighbors != {gate.get().location for gate in fresh.cellList[cell.index].neighbors["allHPA*"]}:
+            problems.append("gate %s shares nodes with different gates than in fresh map" % cell.location)
+
+    for combo, ref in built.paths.items():
+        path = list(ref.get())
+        steps = zip(path, path[1:])
+        if path[0] != combo[0] or path[-1] != combo[1] or \
+                any(max(abs(a.x - b.x), abs(a.y - b.y)) != 1 or not built.validMove(a, b) for a, b in steps):
+            problems.append("gate path %s -> %s does not go around walls" % combo)
+
+    return problems + sameAbstraction(built)
+
+
+def checkNoHolds(seed=0, ticks=600):
+    """plays waves with smoothing off so joined paths keep every point, enemies not searching cooperatively must never
+    hold still and their paths must not repeat a point"""
+    game = generatedGame(seed)
+    game.smoothPaths = False
+    dt = settings.normalizedFrameRate / settings.simTickRate
+
+    problems = []
+    for tick in range(ticks):
+        game.runEvent(dt)
+        for enemy in game.sprites.enemies:
+            if enemy.holding > 0:
+                problems.append("enemy at %s holds still after tick %d" % (enemy.location, tick))
+            elif enemy.path is not None and any(a == b for a, b in zip(enemy.path, list(enemy.path)[1:])):
+                problems.append("path of enemy at %s repeats a point after tick %d" % (enemy.location, tick))
+        if len(problems) > 0 or game.currEvent == "gameOver":
+            break
+    return problems
+
+
+def checkCooperativeFailure(seed=0):
+    """cooperative search whose plan beyond reservation window fails has to return an empty failed path"""
+    game = generatedGame(seed)
+    start = game.sprites.getPlayer().location
+    target = max(game.map.edges, key=lambda edge: abs(edge.x - start.x) + abs(edge.y - start.y))
+
+    path = game.map.cooperativeSearch(start, target, game.reservations, object(), abort=1)
+    if not path.failed:
+        return ["search aborted beyond reservation window did not fail"]
+    if len(path) > 0:
+        return ["failed cooperative search returned %d points" % len(path)]
+    return []
+
+
+def checkBatchOnlyFar(seed=0, ticks=900):
+    """batched search can not steer around other enemies' paths, with far enemies using HPA* nothing may be batched,
+    with weighted A* far enemies have to be"""
+    problems = []
+    for farSearch, batched in (("HPA*", False), ("WA*", True)):
+        game = generatedGame(seed)
+        game.batchSearch = True
+        game.farSearch = farSearch
+        dt = settings.normalizedFrameRate / settings.simTickRate
+
+        for tick in range(ticks):
+            game.runEvent(dt)
+            if game.currEvent == "gameOver":
+                break
+
+        types = game.searchLog.summary()["searchTypes"]
+        if ("batch" in types) != batched:
+            problems.append("batch searches %s with far search %s: %s" %
+                            ("missing" if batched else "made", farSearch, types))
+    return problems
+
+
+def playState(game):
+    """everything a tick can change as primitive tuples, games in the same state give equal tuples"""
+    return tuple(getattr(game, name) for name in GameState.snapshotFields), game.random.getstate(), game.sprites.dump()
+
+
+def checkSameSeed(seed=0):
+    """plays two bot games with the same seed side by side, they have to be in the same state after every tick"""
+    first, second = BotGame(seed), BotGame(seed)
+    while not first.finished():
+        first.step()
+        second.step()
+        if playState(first.game) != playState(second.game):
+            return ["games with seed %d differ after tick %d in %s" % (seed, first.ticks, first.game.currEvent)]
+    return []
+
+
+def checkRestore(seed=0, every=97, ticks=120):
+    """
+    snapshots a bot game every few ticks, building walls and in waves, games restored from snapshots with a bot in
+    the same state have to stay in the same state as the original for ticks ticks
+    """
+    run = BotGame(seed)
+    states = []
+    restored = []  # (tick snapshot was taken after, restored game)
+    while not run.finished():
+        run.step()
+        states.append(playState(run.game))
+        if run.ticks % every == 0:
+            bot = run.bot.twin()
+            game = GameState.restore(run.game.snapshot(), bot, random.Random())
+            bot.game = game
+            restored.append((run.ticks, game))
+
+    problems = []
+    for tick, game in restored:
+        if playState(game) != states[tick - 1]:
+            problems.append("game restored after tick %d differs from original" % tick)
+            continue
+        for later in range(tick, min(tick + ticks, len(states))):
+            game.runEvent(run.dt)
+            if playState(game) != states[later]:
+                problems.append("game restored after tick %d differs from original %d ticks later in %s" %
+                                (tick, later + 1 - tick, game.currEvent))
+                break
+    return problems
+
+
+checks = (checkDestroyedWalls, checkWallEvents, checkDeadNotMarked, checkAbstractGraph, checkBuildPhase, checkNoHolds,
+          checkCooperativeFailure, checkBatchOnlyFar, checkSameSeed, checkRestore)
+
+
+def main():
+    failed = False
+    for check in checks:
+        problems = check()
+        print("%-24s %s" % (check.__name__, "ok" if len(problems) == 0 else "FAILED"))
+        for problem in problems[:10]:
+            print("    " + problem)
+        failed = failed or len(problems) > 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Warm-start benchmarks from game snapshots, builds a late wave once and replays it as often as needed without playing
+through earlier waves
+
+Run from the project root with: python -m testing.snapshot [--wave N] [--enemies N] [--ticks N] [--out FILE]
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from core.state import GameState
+from data import settings
+from testing.batch import Bot, BotGame
+
+from time import perf_counter
+import argparse
+import random
+
+
+def lateWave(waveNum=30, numEnemies=200, seed=0):
+    """
+    game in the middle of a late wave, bot builds walls and map is generated as usual, then wave modifiers are set as
+    if waveNum waves were played and numEnemies enemies are spawned on edges of map
+
+    Parameters:
+        waveNum -> wave game is set to
+        numEnemies -> enemies spawned, more than fit on edges puts several on one edge
+        seed -> seed for bot and game
+    """
+    run = BotGame(seed)
+    game = run.game
+    while game.currEvent != "wait":
+        run.step()
+
+    game.waveNum = waveNum
+    game.enemySpeed = game.maxEnemySpeed - 0.5
+    game.enemyHealth = game.maxEnemyHealth - 1
+    game.enemiesPerWave = len(game.map.edges)
+
+    for _ in range(numEnemies):
+        speed = game.enemySpeed + game.random.randint(-game.deviation[0], game.deviation[1]) / 2
+        health = game.enemyHealth + game.random.randint(-game.deviation[0], game.deviation[1])
+        game.sprites.spawnEnemy(game.random.choice(game.map.edges), health, speed)
+
+    game.prevEvent = "spawnWave"
+    game.currEvent = "update"
+    return game
+
+
+def saveSnapshot(game, path):
+    """writes snapshot of game to file"""
+    with open(path, "wb") as file:
+        file.write(game.snapshot())
+
+
+def loadSnapshot(path, seed=0):
+    """reads snapshot from file, returns restored game played by bot"""
+    with open(path, "rb") as file:
+        return restoreWithBot(file.read(), seed)
+
+
+def restoreWithBot(snapshot, seed=0):
+    """restores game from snapshot bytes with bot as its controller and its own random source"""
+    bot = Bot(seed)
+    game = GameState.restore(snapshot, bot, random.Random())
+    bot.game = game
+    return game
+
+
+def replay(snapshot, ticks=300, seed=0):
+    """restores snapshot and runs up to ticks sim ticks, returns seconds spent on each tick"""
+    game = restoreWithBot(snapshot, seed)
+    dt = settings.normalizedFrameRate / settings.simTickRate
+
+    times = []
+    while len(times) < ticks and game.currEvent != "gameOver":
+        start = perf_counter()
+        game.runEvent(dt)
+        times.append(perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="builds a late wave snapshot and replays it")
+    parser.add_argument("--wave", type=int, default=30)
+    parser.add_argument("--enemies", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="file to save snapshot to")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    game = lateWave(args.wave, args.enemies, args.seed)
+    snapshot = game.snapshot()
+    print("built wave %d with %d enemies in %.2f s, snapshot is %d bytes" %
+          (args.wave, args.enemies, perf_counter() - start, len(snapshot)))
+
+    if args.out is not None:
+        saveSnapshot(game, args.out)
+
+    start = perf_counter()
+    restoreWithBot(snapshot, args.seed)
+    print("restored in %.3f s" % (perf_counter() - start))
+
+    times = replay(snapshot, args.ticks, args.seed)
+    print("%d ticks, mean %.2f ms, max %.2f ms" % (len(times), 1000 * sum(times) / len(times), 1000 * max(times)))
+
+
+if __name__ == "__main__":
+    main()